@@ -27,6 +27,11 @@ _client: Optional[Client] = None
 # 交易對資訊快取（symbol -> symbol_info）
 _symbol_info_cache: Dict[str, Dict[str, Any]] = {}
 
+# 所有倉位資訊（futures_position_information）的短期快取：(取得時間, 回傳資料)
+# 背景停損任務與 /binance/open-positions 會在短時間內重複查詢，TTL 內共用同一份結果
+POSITION_INFO_CACHE_TTL = float(os.getenv("POSITION_INFO_CACHE_TTL", "1.0"))
+_position_info_cache: Optional[tuple] = None
+
 
 def get_client() -> Client:
     """
@@ -284,6 +289,39 @@ def get_mark_price(symbol: str) -> float:
         raise Exception(error_msg)
 
 
+def get_all_position_information(client: Optional[Client] = None) -> List[Dict[str, Any]]:
+    """
+    取得所有交易對的期貨倉位資訊（帶短期快取）
+    
+    在 POSITION_INFO_CACHE_TTL 秒內重複呼叫會直接回傳上一次的結果，
+    下單/平倉後會清除快取。回傳的列表為共用資料，呼叫端不可修改。
+    
+    Args:
+        client: 幣安 Client，未提供時使用 get_client()
+    
+    Returns:
+        list: futures_position_information() 的回傳資料
+    """
+    global _position_info_cache
+    
+    now = time.monotonic()
+    cached = _position_info_cache
+    if cached is not None and now - cached[0] < POSITION_INFO_CACHE_TTL:
+        return cached[1]
+    
+    if client is None:
+        client = get_client()
+    raw_positions = client.futures_position_information()
+    _position_info_cache = (now, raw_positions)
+    return raw_positions
+
+
+def invalidate_position_information_cache() -> None:
+    """清除倉位資訊快取（下單或平倉後呼叫）"""
+    global _position_info_cache
+    _position_info_cache = None
+
+
 def open_futures_market_order(
     symbol: str,
     side: str,
@@ -350,6 +388,7 @@ def open_futures_market_order(
             quantity=formatted_qty,
             newClientOrderId=client_order_id
         )
+        invalidate_position_information_cache()
         
         logger.info(f"成功建立訂單: {order.get('orderId')}, 狀態: {order.get('status')}")
         return order
@@ -428,6 +467,7 @@ def close_futures_position(
             reduceOnly=True,  # 設定為只減倉，確保是平倉單
             newClientOrderId=client_order_id
         )
+        invalidate_position_information_cache()
         
         logger.info(f"成功建立平倉訂單: {order.get('orderId')}, 狀態: {order.get('status')}")
         
@@ -517,6 +557,7 @@ def update_all_bots_invest_amount(max_invest_usdt: float, bot_ids: Optional[List
         try:
             from db import SessionLocal
             from models import BotConfig
+            from sqlalchemy import update
             from datetime import datetime, timezone
         except ImportError as e:
             error_msg = f"無法導入資料庫模組: {e}，請確保 db.py 和 models.py 存在"
@@ -526,30 +567,30 @@ def update_all_bots_invest_amount(max_invest_usdt: float, bot_ids: Optional[List
         # 建立資料庫會話
         db = SessionLocal()
         try:
-            # 查詢要更新的 Bot
+            # 以單一 UPDATE ... RETURNING id 更新 max_invest_usdt，並直接取得實際更新的 Bot ID
+            # （不需要先 SELECT 一次 id 再 UPDATE）
+            stmt = (
+                update(BotConfig)
+                .values(max_invest_usdt=max_invest_usdt, updated_at=datetime.now(timezone.utc))
+                .returning(BotConfig.id)
+            )
             if bot_ids is not None and len(bot_ids) > 0:
                 # 僅更新指定的 Bot
-                bots = db.query(BotConfig).filter(BotConfig.id.in_(bot_ids)).all()
-                if not bots:
-                    error_msg = f"找不到指定的 Bot IDs: {bot_ids}"
-                    logger.warning(error_msg)
-                    return {
-                        "success": False,
-                        "updated_count": 0,
-                        "bot_ids": [],
-                        "message": error_msg
-                    }
-            else:
-                # 更新所有 Bot
-                bots = db.query(BotConfig).all()
+                stmt = stmt.where(BotConfig.id.in_(bot_ids))
+            updated_ids = list(db.execute(stmt).scalars())
+            
+            if bot_ids is not None and len(bot_ids) > 0 and not updated_ids:
+                error_msg = f"找不到指定的 Bot IDs: {bot_ids}"
+                logger.warning(error_msg)
+                return {
+                    "success": False,
+                    "updated_count": 0,
+                    "bot_ids": [],
+                    "message": error_msg
+                }
             
-            # 更新每個 Bot 的 max_invest_usdt
-            updated_ids = []
-            for bot in bots:
-                bot.max_invest_usdt = max_invest_usdt
-                bot.updated_at = datetime.now(timezone.utc)
-                updated_ids.append(bot.id)
-                logger.info(f"更新 Bot {bot.id} ({bot.name}) 的 max_invest_usdt 為 {max_invest_usdt} USDT")
+            if updated_ids:
+                logger.info(f"更新 Bot {updated_ids} 的 max_invest_usdt 為 {max_invest_usdt} USDT")
             
             # 提交變更
             db.commit()
@@ -5,23 +5,63 @@
 使用 SQLite 作為資料庫，方便本地開發和測試。
 """
 
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.ext.declarative import declarative_base
 
+# JSON 欄位（例如 TradingViewSignalLog.raw_body）的序列化：有安裝 orjson 時改用 orjson，
+# 否則使用 SQLAlchemy 預設的標準 json
+try:
+    import orjson
+    
+    def _json_serializer(value):
+        return orjson.dumps(value).decode("utf-8")
+    
+    _json_engine_kwargs = {"json_serializer": _json_serializer, "json_deserializer": orjson.loads}
+except ImportError:
+    _json_engine_kwargs = {}
+
 # 資料庫檔案路徑（儲存在專案根目錄）
 DATABASE_URL = "sqlite:///./trading_bot.db"
 
 # 建立資料庫引擎
 # connect_args={"check_same_thread": False} 是 SQLite 特有設定，允許多線程存取
+# timeout：寫入鎖被佔用時最多等待的秒數（預設 5 秒，背景任務與 API 同時寫入時容易逾時）
+# pool_use_lifo=True：優先重用最近歸還的連線，webhook 突發流量過後多餘的 overflow 連線會閒置並被關閉
+# 連線池大小可用 DB_POOL_SIZE / DB_MAX_OVERFLOW 環境變數調整
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False},
+    connect_args={"check_same_thread": False, "timeout": 30},
+    pool_size=int(os.getenv("DB_POOL_SIZE", "10")),
+    max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "20")),
+    pool_timeout=30,
+    pool_use_lifo=True,
+    **_json_engine_kwargs,
     echo=False  # 設為 True 可以看到 SQL 語句，方便除錯
 )
 
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    每個新連線建立時設定 SQLite PRAGMA
+    
+    - journal_mode=WAL：讀取不會被寫入阻塞（設定會保存在資料庫檔案中）
+    - synchronous=NORMAL：WAL 模式下只在 checkpoint 時 fsync，commit 更快
+    - temp_store=MEMORY：暫存表 / 排序使用記憶體
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
 # 建立 Session 類別，用於建立資料庫會話
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False：commit 後保留物件上剛寫入的值，不需要再 refresh 重新 SELECT
+# （server default / onupdate 欄位由模型的 eager_defaults 透過 RETURNING 取回）
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 # Base 類別，所有 ORM 模型都會繼承這個類別
 Base = declarative_base()
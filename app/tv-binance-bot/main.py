@@ -5,17 +5,17 @@ FastAPI 應用程式入口點
 所有訂單都會記錄到資料庫中，方便追蹤和查詢。
 """
 
-from fastapi import FastAPI, HTTPException, Depends, Header, Request, Query, Request, status
-from fastapi.responses import JSONResponse, RedirectResponse, HTMLResponse
+from fastapi import FastAPI, HTTPException, Depends, Header, Request, Query, status, BackgroundTasks
+from fastapi.responses import JSONResponse, RedirectResponse, HTMLResponse, Response
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from starlette.middleware.sessions import SessionMiddleware
-from sqlalchemy.orm import Session
-from sqlalchemy import delete, and_, or_
+from sqlalchemy.orm import Session, selectinload, joinedload, load_only
+from sqlalchemy import delete, update, and_, or_
 from pydantic import BaseModel, Field
 from typing import Optional, List
 from dataclasses import dataclass
-from copy import copy
+from types import SimpleNamespace
 import os
 import asyncio
 import logging
@@ -26,6 +26,52 @@ import json
 import hashlib
 from datetime import datetime, timezone, date, timedelta
 from fastapi.responses import StreamingResponse
+from decimal import Decimal
+
+
+def _json_default(obj):
+    """JSON 序列化時處理 datetime / date / Decimal（直接回傳 dict 的端點使用）"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+# orjson 為可選依賴：安裝時使用 ORJSONResponse（C 實作的 JSON 序列化），否則退回標準 JSONResponse
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse
+
+    class FastJSONResponse(ORJSONResponse):
+        def render(self, content) -> bytes:
+            return orjson.dumps(content, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+except ImportError:
+    class FastJSONResponse(JSONResponse):
+        def render(self, content) -> bytes:
+            return json.dumps(
+                content,
+                ensure_ascii=False,
+                allow_nan=False,
+                default=_json_default,
+                separators=(",", ":"),
+            ).encode("utf-8")
+
+# Pydantic v1/v2 兼容：在匯入時決定一次要使用的方法，避免每次呼叫都用 hasattr 判斷
+PYDANTIC_V2 = hasattr(BaseModel, "model_dump")
+if PYDANTIC_V2:
+    _model_dump = BaseModel.model_dump
+    _model_dump_json = BaseModel.model_dump_json
+
+    def _model_from_orm(model_cls, obj):
+        return model_cls.model_validate(obj)
+else:
+    _model_dump = BaseModel.dict
+    _model_dump_json = BaseModel.json
+
+    def _model_from_orm(model_cls, obj):
+        return model_cls.from_orm(obj)
+
 from authlib.integrations.starlette_client import OAuth
 from dotenv import load_dotenv
 
@@ -41,7 +87,9 @@ from binance_client import (
     close_futures_position,
     get_symbol_info,
     update_all_bots_invest_amount,
-    format_quantity
+    format_quantity,
+    get_all_position_information,
+    invalidate_position_information_cache,
 )
 
 # 設定日誌
@@ -84,17 +132,65 @@ DYN_BASE_SL_PCT = float(os.getenv("DYN_BASE_SL_PCT", "3.0"))
 
 # ==================== 非 bot 創建的 position 歷史最高價格追蹤 ====================
 # 用於追蹤非 bot 創建的 position 的歷史最高/最低價格
-# key: f"{symbol}|{position_side}" (例如: "BNBUSDT|LONG")
-# value: {"highest_price": float, "entry_price": float, "side": str}
+# key: (symbol, position_side) tuple (例如: ("BNBUSDT", "LONG"))
+# value: _NonBotTrack（entry_price, highest_price, side）
 # 注意：這個映射只存在於記憶體中，應用重啟後會重置
-_non_bot_position_tracking: dict[str, dict] = {}
+class _NonBotTrack:
+    """非 bot 倉位的追蹤記錄（使用 __slots__，每次更新直接修改屬性，不重建 dict）"""
+    __slots__ = ("entry_price", "highest_price", "side")
+
+    def __init__(self, entry_price: float, highest_price: Optional[float], side: str):
+        self.entry_price = entry_price
+        self.highest_price = highest_price  # LONG: 最高價, SHORT: 最低價
+        self.side = side
+
+
+_non_bot_position_tracking: dict[tuple[str, str], _NonBotTrack] = {}
+
+# 追蹤記錄數量上限：倉位關閉時會清理記錄，但如果沒有觸發清理（例如孤立的記錄），
+# 避免映射無限制成長；超過上限時移除最早建立的記錄（dict 保留插入順序），上限至少為 1
+NON_BOT_TRACKING_MAX = max(1, int(os.getenv("NON_BOT_TRACKING_MAX", "10000")))
+
+
+def _start_non_bot_track(key: tuple, entry_price: float, side: str) -> _NonBotTrack:
+    """建立新的非 bot 倉位追蹤記錄並放入 _non_bot_position_tracking（必要時淘汰最舊的記錄）"""
+    _non_bot_position_tracking.pop(key, None)
+    while len(_non_bot_position_tracking) >= NON_BOT_TRACKING_MAX:
+        del _non_bot_position_tracking[next(iter(_non_bot_position_tracking))]
+    track = _NonBotTrack(entry_price, None, side)
+    _non_bot_position_tracking[key] = track
+    return track
 
 # ==================== Binance Live Positions 停損配置覆寫 ====================
 # 用於存儲 Binance Live Positions 的停損配置覆寫值
-# key: f"{symbol}|{position_side}" (例如: "BNBUSDT|LONG")
-# value: {"dyn_profit_threshold_pct": float | None, "base_stop_loss_pct": float | None, "trail_callback": float | None}
+# key: (symbol, position_side) tuple (例如: ("BNBUSDT", "LONG"))
+# value: _StopOverride（dyn_profit_threshold_pct, base_stop_loss_pct, trail_callback；None 表示沒有覆寫）
 # 注意：這個映射只存在於記憶體中，應用重啟後會重置
-_binance_position_stop_overrides: dict[str, dict] = {}
+class _StopOverride:
+    """Binance Live Position 的停損配置覆寫值（使用 __slots__，讀取時直接取屬性，不做 dict 查找）"""
+    __slots__ = ("dyn_profit_threshold_pct", "base_stop_loss_pct", "trail_callback")
+
+    def __init__(self):
+        self.dyn_profit_threshold_pct: Optional[float] = None
+        self.base_stop_loss_pct: Optional[float] = None
+        self.trail_callback: Optional[float] = None
+
+    def to_dict(self) -> dict:
+        """只包含有設定的覆寫值（用於 API 回應與日誌）"""
+        return {
+            name: getattr(self, name)
+            for name in self.__slots__
+            if getattr(self, name) is not None
+        }
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+
+# 沒有覆寫時使用的共用空物件（只讀，不可修改）
+_NO_STOP_OVERRIDE = _StopOverride()
+
+_binance_position_stop_overrides: dict[tuple[str, str], _StopOverride] = {}
 
 # ==================== 風控設定 ====================
 # 允許交易的交易對列表
@@ -116,7 +212,9 @@ MAX_QTY_PER_SYMBOL = {
 app = FastAPI(
     title="TradingView Binance Bot",
     description="接收 TradingView webhook 並在幣安期貨測試網下單",
-    version="1.0.0"
+    version="1.0.0",
+    # 有安裝 orjson 時所有 JSON 回應都使用 ORJSONResponse 序列化
+    default_response_class=FastJSONResponse,
 )
 
 # 設定 Session Middleware（用於 Google OAuth）
@@ -196,10 +294,11 @@ async def trailing_stop_worker():
             
             if positions:
                 logger.info(f"檢查 {len(positions)} 個開啟的倉位（資料庫中的倉位）")
-                # 記錄沒有 lock_ratio 的倉位（只使用 base stop）
-                positions_without_lock = [p for p in positions if p.trail_callback is None]
-                if positions_without_lock:
-                    logger.debug(f"其中 {len(positions_without_lock)} 個倉位沒有設定 lock_ratio，將使用 base stop")
+                # 記錄沒有 lock_ratio 的倉位（只使用 base stop）；僅在 DEBUG 時才逐筆計數
+                if logger.isEnabledFor(logging.DEBUG):
+                    without_lock_count = sum(1 for p in positions if p.trail_callback is None)
+                    if without_lock_count:
+                        logger.debug(f"其中 {without_lock_count} 個倉位沒有設定 lock_ratio，將使用 base stop")
             
             # 對每個 position 進行檢查
             for position in positions:
@@ -210,6 +309,10 @@ async def trailing_stop_worker():
                     # 繼續處理下一個倉位，不要因為單一倉位錯誤而停止整個任務
                     continue
             
+            # 本輪所有倉位的追蹤價格更新在同一個 transaction 中寫入（不逐筆 commit）；沒有變更時不 commit
+            if db.dirty:
+                db.commit()
+            
             # 檢查 Binance 上的非 bot 創建倉位
             try:
                 await check_binance_non_bot_positions(db)
@@ -231,6 +334,10 @@ async def trailing_stop_worker():
         await asyncio.sleep(5)
 
 
+# 同時向 Binance 送出平倉單的最大併發數（避免觸發下單頻率限制）
+CLOSE_ORDER_CONCURRENCY = int(os.getenv("CLOSE_ORDER_CONCURRENCY", "8"))
+
+
 async def check_binance_non_bot_positions(db: Session):
     """
     檢查 Binance 上的非 bot 創建倉位，並觸發停損（如果滿足條件）
@@ -245,24 +352,27 @@ async def check_binance_non_bot_positions(db: Session):
         # 嘗試取得 Binance client
         client = get_client()
         
-        # 使用 USDT-M Futures position info
-        raw_positions = client.futures_position_information()
+        # 使用 USDT-M Futures position info（短期快取，與其他呼叫端共用）
+        raw_positions = get_all_position_information(client)
         
-        for item in raw_positions:
-            try:
-                position_amt = float(item.get("positionAmt", "0") or 0)
-            except (ValueError, TypeError):
-                position_amt = 0.0
-            
-            if position_amt == 0:
-                continue
-            
+        # 一次載入所有本地 OPEN 倉位的 (symbol, side)，迴圈中以 set 判斷，不必每個 Binance 倉位各查一次
+        local_open_keys = set(
+            db.query(Position.symbol, Position.side)
+            .filter(Position.status == "OPEN")
+            .distinct()
+            .all()
+        )
+        
+        # 觸發停損、待平倉的倉位
+        to_close = []
+        
+        for item, position_amt in _iter_open_position_items(raw_positions):
             # 解析其他欄位
             try:
-                entry_price = float(item.get("entryPrice", "0") or 0)
-                mark_price = float(item.get("markPrice", "0") or 0)
-                unrealized_pnl = float(item.get("unRealizedProfit", "0") or 0)
-                leverage = int(float(item.get("leverage", "0") or 0))
+                entry_price = _safe_float(item, "entryPrice")
+                mark_price = _safe_float(item, "markPrice")
+                unrealized_pnl = _safe_float(item, "unRealizedProfit")
+                leverage = int(_safe_float(item, "leverage"))
             except (ValueError, TypeError) as e:
                 logger.warning(f"解析 Binance position 欄位失敗: {item.get('symbol', 'unknown')}, 錯誤: {e}")
                 continue
@@ -270,78 +380,44 @@ async def check_binance_non_bot_positions(db: Session):
             symbol = item.get("symbol", "")
             side_local = "LONG" if position_amt > 0 else "SHORT"
             
-            # 查找匹配的本地 Position（最新的 OPEN 倉位）
-            local_pos = (
-                db.query(Position)
-                .filter(
-                    Position.symbol == symbol.upper(),
-                    Position.side == side_local,
-                    Position.status == "OPEN",
-                )
-                .order_by(Position.id.desc())
-                .first()
-            )
-            
-            # 如果找到本地 Position，跳過（已經由 check_trailing_stop 處理）
-            if local_pos:
+            # 如果有對應的本地 OPEN Position，跳過（已經由 check_trailing_stop 處理）
+            if (symbol.upper(), side_local) in local_open_keys:
                 continue
             
             # 這是非 bot 創建的倉位，需要檢查停損
-            tracking_key = f"{symbol}|{side_local}"
-            override_key = f"{symbol}|{side_local}"
-            overrides = _binance_position_stop_overrides.get(override_key, {})
+            # 追蹤記錄與停損覆寫共用同一個 (symbol, side) key
+            position_key = (symbol, side_local)
+            overrides = _binance_position_stop_overrides.get(position_key, _NO_STOP_OVERRIDE)
             
-            # 檢查是否已有追蹤記錄
-            if tracking_key in _non_bot_position_tracking:
-                tracked = _non_bot_position_tracking[tracking_key]
-                tracked_entry = tracked.get("entry_price")
-                tracked_highest = tracked.get("highest_price")
-                
-                # 如果 entry_price 改變，重置追蹤
-                if tracked_entry is None or (abs(tracked_entry - entry_price) / max(abs(tracked_entry), abs(entry_price), 1.0)) > 0.001:
-                    tracked_entry = entry_price
-                    tracked_highest = None
-            else:
-                tracked_entry = entry_price
-                tracked_highest = None
+            # 檢查是否已有追蹤記錄；沒有記錄或 entry_price 改變時重置追蹤
+            track = _non_bot_position_tracking.get(position_key)
+            if track is None or track.entry_price is None or (abs(track.entry_price - entry_price) / max(abs(track.entry_price), abs(entry_price), 1.0)) > 0.001:
+                track = _start_non_bot_track(position_key, entry_price, side_local)
             
-            # 更新歷史最高/最低價格
+            # 更新歷史最高/最低價格（直接修改追蹤記錄）
             if side_local == "LONG":
-                if tracked_highest is None:
-                    tracked_highest = max(mark_price, entry_price) if entry_price > 0 else mark_price
+                if track.highest_price is None:
+                    track.highest_price = max(mark_price, entry_price) if entry_price > 0 else mark_price
                 else:
-                    tracked_highest = max(tracked_highest, mark_price)
+                    track.highest_price = max(track.highest_price, mark_price)
             else:
-                if tracked_highest is None:
-                    tracked_highest = min(mark_price, entry_price) if entry_price > 0 else mark_price
+                if track.highest_price is None:
+                    track.highest_price = min(mark_price, entry_price) if entry_price > 0 else mark_price
                 else:
-                    tracked_highest = min(tracked_highest, mark_price)
-            
-            if tracked_highest is None:
-                tracked_highest = mark_price
+                    track.highest_price = min(track.highest_price, mark_price)
             
-            # 更新追蹤記錄
-            _non_bot_position_tracking[tracking_key] = {
-                "entry_price": tracked_entry,
-                "highest_price": tracked_highest,
-                "side": side_local
-            }
+            tracked_entry = track.entry_price
+            tracked_highest = track.highest_price
             
             # 建立臨時 Position 物件
-            class TempPosition:
-                def __init__(self, entry_price, side, highest_price=None):
-                    self.entry_price = entry_price
-                    self.side = side
-                    self.highest_price = highest_price
-                    self.trail_callback = overrides.get("trail_callback")
-                    self.dyn_profit_threshold_pct = overrides.get("dyn_profit_threshold_pct")
-                    self.base_stop_loss_pct = overrides.get("base_stop_loss_pct")
-                    self.symbol = symbol
-            
             temp_pos = TempPosition(
                 entry_price=tracked_entry if tracked_entry else entry_price,
                 side=side_local,
-                highest_price=tracked_highest
+                highest_price=tracked_highest,
+                trail_callback=overrides.trail_callback,
+                dyn_profit_threshold_pct=overrides.dyn_profit_threshold_pct,
+                base_stop_loss_pct=overrides.base_stop_loss_pct,
+                symbol=symbol,
             )
             
             # 計算 unrealized_pnl_pct
@@ -384,89 +460,152 @@ async def check_binance_non_bot_positions(db: Session):
             
             # 記錄檢查結果
             if dyn_stop is not None:
-                logger.info(
-                    f"非 bot 創建倉位 {symbol} ({side_local}) 停損檢查："
-                    f"mark={mark_price:.6f}, dyn_stop={dyn_stop:.6f}, "
-                    f"stop_mode={stop_state.stop_mode}, triggered={triggered}, mode={mode}"
-                )
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(
+                        f"非 bot 創建倉位 {symbol} ({side_local}) 停損檢查："
+                        f"mark={mark_price:.6f}, dyn_stop={dyn_stop:.6f}, "
+                        f"stop_mode={stop_state.stop_mode}, triggered={triggered}, mode={mode}"
+                    )
             elif stop_state.stop_mode == "base":
                 logger.warning(
                     f"非 bot 創建倉位 {symbol} ({side_local}) base mode 但 dyn_stop 為 None, "
                     f"base_stop_price={stop_state.base_stop_price}"
                 )
             
-            # 如果觸發停損，關閉倉位
+            # 如果觸發停損，先記下來；所有倉位檢查完後再一起併發送出平倉單
             if triggered:
                 logger.info(
                     f"非 bot 創建倉位 {symbol} ({side_local}) 觸發 {mode}，"
                     f"目前價格: {mark_price}, 停損線: {dyn_stop}"
                 )
+                to_close.append({
+                    "symbol": symbol,
+                    "side": side_local,
+                    "qty": abs(position_amt),
+                    "mode": mode,
+                    "entry_price": tracked_entry if tracked_entry else entry_price,
+                    "highest_price": tracked_highest if tracked_highest else None,
+                    "mark_price": mark_price,
+                    "overrides": overrides,
+                    "position_key": position_key,
+                })
+        
+        if not to_close:
+            return
+        
+        # auto_close_enabled 始終啟用（強制）
+        # close_futures_position 是同步的 Binance REST 呼叫：以 asyncio.to_thread 併發送出，
+        # 並用 Semaphore 限制同時進行的下單數（避免觸發 API 頻率限制）
+        semaphore = asyncio.Semaphore(CLOSE_ORDER_CONCURRENCY)
+        
+        async def _close_one(entry: dict):
+            async with semaphore:
+                return await asyncio.to_thread(
+                    close_futures_position,
+                    symbol=entry["symbol"],
+                    position_side=entry["side"],
+                    qty=entry["qty"],
+                    position_id=None,  # 非 bot 創建的倉位沒有 position_id
+                )
+        
+        results = await asyncio.gather(*(_close_one(entry) for entry in to_close), return_exceptions=True)
+        
+        # 平倉紀錄先在記憶體中建立，最後一次 add_all + commit 寫入（不逐筆 commit）
+        records = []
+        closed_at = datetime.now(timezone.utc)
+        # position information 已帶有標記價格，平倉價格需要 fallback 時直接使用，不再逐筆查詢
+        mark_prices = {entry["symbol"]: entry["mark_price"] for entry in to_close}
+        for entry, close_order in zip(to_close, results):
+            symbol = entry["symbol"]
+            side_local = entry["side"]
+            mode = entry["mode"]
+            overrides = entry["overrides"]
+            
+            if isinstance(close_order, Exception):
+                logger.error(f"關閉非 bot 創建倉位 {symbol} ({side_local}) 失敗: {close_order}")
+                continue
+            
+            logger.info(
+                f"非 bot 創建倉位 {symbol} ({side_local}) 已關倉，"
+                f"order_id={close_order.get('orderId', 'unknown')}"
+            )
+            
+            # 倉位已在 Binance 關閉，不論紀錄是否寫入成功都清理追蹤記錄
+            if _non_bot_position_tracking.pop(entry["position_key"], None) is not None:
+                logger.debug("清理非 bot 倉位追蹤記錄: %s|%s", symbol, side_local)
+            
+            try:
+                # 取得平倉價格
+                exit_price = get_exit_price_from_order(close_order, symbol, mark_prices)
                 
-                # auto_close_enabled 始終啟用（強制）
-                # 呼叫關倉函式
-                try:
-                    close_order = close_futures_position(
-                        symbol=symbol,
-                        position_side=side_local,
-                        qty=abs(position_amt),
-                        position_id=None  # 非 bot 創建的倉位沒有 position_id
-                    )
-                    
-                    logger.info(
-                        f"非 bot 創建倉位 {symbol} ({side_local}) 已關倉，"
-                        f"order_id={close_order.get('orderId', 'unknown')}"
-                    )
-                    
-                    # 取得平倉價格
-                    exit_price = get_exit_price_from_order(close_order, symbol)
-                    
-                    # 建立 Position 記錄（用於統計計算）
-                    position = Position(
-                        bot_id=None,  # 非 bot 創建的倉位
-                        tv_signal_log_id=None,  # 非 bot 創建的倉位
-                        symbol=symbol.upper(),
-                        side=side_local,
-                        qty=abs(position_amt),
-                        entry_price=tracked_entry if tracked_entry else entry_price,
-                        exit_price=exit_price,
-                        status="CLOSED",
-                        closed_at=datetime.now(timezone.utc),
-                        exit_reason=mode,  # base_stop 或 dynamic_trailing
-                        binance_order_id=int(close_order.get("orderId")) if close_order.get("orderId") else None,
-                        client_order_id=close_order.get("clientOrderId"),
-                        # 記錄停損相關配置（用於追蹤）
-                        trail_callback=overrides.get("trail_callback"),
-                        dyn_profit_threshold_pct=overrides.get("dyn_profit_threshold_pct"),
-                        base_stop_loss_pct=overrides.get("base_stop_loss_pct"),
-                        highest_price=tracked_highest if tracked_highest else None,
-                    )
-                    
-                    db.add(position)
-                    db.commit()
-                    db.refresh(position)
-                    
-                    logger.info(
-                        f"非 bot 創建倉位 {symbol} ({side_local}) 已建立資料庫記錄 "
-                        f"(position_id={position.id}, exit_reason={mode}, exit_price={exit_price})"
+                # 建立 Position 記錄（用於統計計算）
+                records.append(Position(
+                    bot_id=None,  # 非 bot 創建的倉位
+                    tv_signal_log_id=None,  # 非 bot 創建的倉位
+                    symbol=symbol.upper(),
+                    side=side_local,
+                    qty=entry["qty"],
+                    entry_price=entry["entry_price"],
+                    exit_price=exit_price,
+                    status="CLOSED",
+                    closed_at=closed_at,
+                    exit_reason=mode,  # base_stop 或 dynamic_trailing
+                    binance_order_id=int(close_order.get("orderId")) if close_order.get("orderId") else None,
+                    client_order_id=close_order.get("clientOrderId"),
+                    # 記錄停損相關配置（用於追蹤）
+                    trail_callback=overrides.trail_callback,
+                    dyn_profit_threshold_pct=overrides.dyn_profit_threshold_pct,
+                    base_stop_loss_pct=overrides.base_stop_loss_pct,
+                    highest_price=entry["highest_price"],
+                ))
+            except Exception as e:
+                logger.error(f"建立非 bot 創建倉位 {symbol} ({side_local}) 平倉記錄失敗: {e}")
+        
+        if records:
+            try:
+                db.add_all(records)
+                db.commit()
+                logger.info(f"已建立 {len(records)} 筆非 bot 創建倉位的平倉記錄")
+                for position in records:
+                    logger.debug(
+                        "非 bot 創建倉位 %s (%s) 平倉記錄 position_id=%s, exit_reason=%s, exit_price=%s",
+                        position.symbol, position.side, position.id, position.exit_reason, position.exit_price,
                     )
-                    
-                    # 清理追蹤記錄
-                    if tracking_key in _non_bot_position_tracking:
-                        del _non_bot_position_tracking[tracking_key]
-                        logger.debug(f"清理非 bot 倉位追蹤記錄: {tracking_key}")
-                    
-                except Exception as e:
-                    logger.error(f"關閉非 bot 創建倉位 {symbol} ({side_local}) 失敗: {e}")
-                    db.rollback()
-                    # 繼續處理下一個倉位
-                    continue
+            except Exception as e:
+                logger.error(f"寫入非 bot 創建倉位平倉記錄失敗: {e}")
+                db.rollback()
                     
     except Exception as e:
         logger.error(f"檢查 Binance 非 bot 創建倉位時發生錯誤: {e}")
         # 不要拋出異常，讓主循環繼續運行
 
 
-def get_exit_price_from_order(close_order: dict, symbol: str) -> float:
+def _safe_float(d: dict, key: str, default: float = 0.0) -> float:
+    """
+    從 Binance 回傳的 dict 取出數值欄位並轉為 float。
+    
+    Binance 可能回傳字串 "0"、空字串或缺少該欄位，一律以 default 處理。
+    """
+    v = d.get(key)
+    return float(v) if v else default
+
+
+def _iter_open_position_items(raw_positions):
+    """
+    逐筆產生持倉不為 0 的 Binance position：(item, position_amt)
+    
+    Binance 會回傳所有交易對（大多數 positionAmt 為 0），以產生器過濾，不另外建立 list。
+    """
+    for item in raw_positions:
+        try:
+            position_amt = _safe_float(item, "positionAmt")
+        except (ValueError, TypeError):
+            continue
+        if position_amt:
+            yield item, position_amt
+
+
+def get_exit_price_from_order(close_order: dict, symbol: str, mark_prices: Optional[dict] = None) -> float:
     """
     從關倉訂單回傳中取得平倉價格
     
@@ -474,13 +613,15 @@ def get_exit_price_from_order(close_order: dict, symbol: str) -> float:
     1. close_order.get("avgPrice") - 平均成交價格（存在且非空字串且 > 0）
     2. 查詢訂單詳情取得 avgPrice（如果訂單 ID 存在）
     3. close_order.get("price") - 訂單價格（存在且 > 0）
-    4. get_mark_price(symbol) - 標記價格（fallback）
+    4. mark_prices[symbol] - 呼叫端已取得的標記價格（批次平倉時傳入，避免逐筆查詢）
+    5. get_mark_price(symbol) - 標記價格（fallback）
     
     此函式保證一定會回傳一個 float 值，不會拋出例外。
     
     Args:
         close_order: 幣安 API 回傳的關倉訂單資訊
         symbol: 交易對
+        mark_prices: 可選，{symbol: mark_price}，已取得的標記價格
     
     Returns:
         float: 平倉價格
@@ -529,8 +670,10 @@ def get_exit_price_from_order(close_order: dict, symbol: str) -> float:
             except (ValueError, TypeError):
                 pass
         
-        # 如果都沒有，使用標記價格作為 fallback
+        # 如果都沒有，使用標記價格作為 fallback（優先使用呼叫端已取得的價格）
         logger.warning(f"無法從訂單中取得平倉價格，使用 {symbol} 標記價格作為 fallback")
+        if mark_prices and mark_prices.get(symbol):
+            return mark_prices[symbol]
         return get_mark_price(symbol)
     
     except (ValueError, TypeError) as e:
@@ -567,6 +710,85 @@ class StopState:
     dynamic_stop_price: Optional[float]
 
 
+@dataclass
+class TempPosition:
+    """非 bot 創建的倉位用於計算停損的臨時 Position 物件（只包含 compute_stop_state 需要的欄位）"""
+    entry_price: float
+    side: str
+    highest_price: Optional[float] = None  # LONG: 最高價, SHORT: 最低價
+    # 使用覆寫值（如果存在），否則使用 None（會使用全局配置）
+    trail_callback: Optional[float] = None
+    dyn_profit_threshold_pct: Optional[float] = None
+    base_stop_loss_pct: Optional[float] = None
+    symbol: Optional[str] = None
+
+
+def resolve_stop_config_value(override_value, local_value, global_value, default_value) -> tuple:
+    """
+    依優先順序決定停損設定實際使用的值和來源標記
+    
+    優先順序：override (手動設定) > local (bot position 設定，也視為 override) > global (全局設定) > default (默認值)
+    
+    Returns:
+        tuple: (value, source)，source 為 "override"、"global" 或 "default"
+    """
+    if override_value is not None:
+        return override_value, "override"
+    if local_value is not None:
+        return local_value, "override"
+    if global_value is not None:
+        return global_value, "global"
+    return default_value, "default"
+
+
+def resolve_stop_config_fields(
+    profit_override,
+    lock_override,
+    base_sl_override,
+    local_pos=None,
+    config: Optional["TrailingConfig"] = None,
+) -> dict:
+    """
+    一次解析三個停損設定（PnL% 門檻、鎖利比例、基礎停損）的實際值和來源標記
+    
+    Args:
+        profit_override / lock_override / base_sl_override: 手動覆寫值（None 表示沒有覆寫）
+        local_pos: 對應的本地 Position（其設定也視為 override），可選
+        config: 全局設定，預設為 TRAILING_CONFIG
+    
+    Returns:
+        dict: 包含 *_value / *_source 六個欄位，可直接合併到 API 回應中
+    """
+    if config is None:
+        config = TRAILING_CONFIG
+    profit_threshold_value, profit_threshold_source = resolve_stop_config_value(
+        profit_override,
+        local_pos.dyn_profit_threshold_pct if local_pos else None,
+        config.profit_threshold_pct,
+        DYN_PROFIT_THRESHOLD_PCT,
+    )
+    lock_ratio_value, lock_ratio_source = resolve_stop_config_value(
+        lock_override,
+        local_pos.trail_callback if local_pos else None,
+        config.lock_ratio,
+        DYN_LOCK_RATIO_DEFAULT,
+    )
+    base_sl_value, base_sl_source = resolve_stop_config_value(
+        base_sl_override,
+        local_pos.base_stop_loss_pct if local_pos else None,
+        config.base_sl_pct,
+        DYN_BASE_SL_PCT,
+    )
+    return {
+        "profit_threshold_value": profit_threshold_value,
+        "profit_threshold_source": profit_threshold_source,
+        "lock_ratio_value": lock_ratio_value,
+        "lock_ratio_source": lock_ratio_source,
+        "base_sl_value": base_sl_value,
+        "base_sl_source": base_sl_source,
+    }
+
+
 def compute_stop_state(position: Position, mark_price: float, unrealized_pnl_pct: Optional[float] = None, leverage: Optional[int] = None, qty: Optional[float] = None) -> StopState:
     """
     計算倉位的停損狀態（純計算函數，不修改 DB 或下單）
@@ -720,16 +942,17 @@ def compute_stop_state(position: Position, mark_price: float, unrealized_pnl_pct
                 profit_pct_based_on_best_for_threshold = profit_pct_based_on_best
             
             # 調試日誌：記錄停損模式判斷的關鍵參數
-            logger.info(
-                f"compute_stop_state LONG: symbol={getattr(position, 'symbol', 'unknown')}, "
-                f"entry={entry:.4f}, best={best:.4f}, mark={mark:.4f}, "
-                f"profit_pct(price)={profit_pct:.2f}%, unrealized_pnl_pct={unrealized_pnl_pct}, "
-                f"profit_pct_for_threshold={profit_pct_for_threshold:.2f}%, profit_pct_based_on_best={profit_pct_based_on_best:.2f}%, "
-                f"profit_threshold_pct={profit_threshold_pct:.2f}%, "
-                f"trailing_enabled={trailing_enabled}, effective_trailing_enabled={effective_trailing_enabled}, "
-                f"lock_ratio={lock_ratio}, has_override={has_override}, "
-                f"trail_callback_override={trail_callback_override}"
-            )
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    f"compute_stop_state LONG: symbol={getattr(position, 'symbol', 'unknown')}, "
+                    f"entry={entry:.4f}, best={best:.4f}, mark={mark:.4f}, "
+                    f"profit_pct(price)={profit_pct:.2f}%, unrealized_pnl_pct={unrealized_pnl_pct}, "
+                    f"profit_pct_for_threshold={profit_pct_for_threshold:.2f}%, profit_pct_based_on_best={profit_pct_based_on_best:.2f}%, "
+                    f"profit_threshold_pct={profit_threshold_pct:.2f}%, "
+                    f"trailing_enabled={trailing_enabled}, effective_trailing_enabled={effective_trailing_enabled}, "
+                    f"lock_ratio={lock_ratio}, has_override={has_override}, "
+                    f"trail_callback_override={trail_callback_override}"
+                )
             
             # Case 1：Dynamic Trailing（鎖利）
             # 關鍵：一旦 best 曾經達到過 threshold，就應該保持在 dynamic mode
@@ -743,8 +966,8 @@ def compute_stop_state(position: Position, mark_price: float, unrealized_pnl_pct
                 # dynamic_stop_price 基於 best（歷史最高價格）計算，永遠不會下降
                 dynamic_stop_price = entry + (best - entry) * lock_ratio
                 stop_mode = "dynamic"
-                logger.info(f"✓ 進入 Dynamic 模式: dynamic_stop_price={dynamic_stop_price:.4f}, best={best:.4f}, entry={entry:.4f}, lock_ratio={lock_ratio}")
-            else:
+                logger.debug(f"✓ 進入 Dynamic 模式: dynamic_stop_price={dynamic_stop_price:.4f}, best={best:.4f}, entry={entry:.4f}, lock_ratio={lock_ratio}")
+            elif logger.isEnabledFor(logging.DEBUG):
                 # 記錄為什麼沒有進入 dynamic mode
                 reasons = []
                 if not effective_trailing_enabled:
@@ -753,7 +976,7 @@ def compute_stop_state(position: Position, mark_price: float, unrealized_pnl_pct
                     reasons.append(f"lock_ratio=None (trail_callback_override={trail_callback_override})")
                 if profit_pct_for_threshold < profit_threshold_pct:
                     reasons.append(f"profit_pct_for_threshold({profit_pct_for_threshold:.2f}%) < threshold({profit_threshold_pct:.2f}%)")
-                logger.info(f"✗ 未進入 Dynamic 模式: {', '.join(reasons)}")
+                logger.debug(f"✗ 未進入 Dynamic 模式: {', '.join(reasons)}")
             
             # Case 2：Base Stop-Loss（只有當從未進入過 dynamic mode 時才顯示 base stop）
             # 一旦進入 dynamic mode，就不會返回 base mode
@@ -847,16 +1070,17 @@ def compute_stop_state(position: Position, mark_price: float, unrealized_pnl_pct
                 profit_pct_based_on_best_for_threshold = profit_pct_based_on_best
             
             # 調試日誌：記錄停損模式判斷的關鍵參數
-            logger.info(
-                f"compute_stop_state SHORT: symbol={getattr(position, 'symbol', 'unknown')}, "
-                f"entry={entry:.4f}, best={best:.4f}, mark={mark:.4f}, "
-                f"profit_pct(price)={profit_pct:.2f}%, unrealized_pnl_pct={unrealized_pnl_pct}, "
-                f"profit_pct_for_threshold={profit_pct_for_threshold:.2f}%, profit_pct_based_on_best={profit_pct_based_on_best:.2f}%, "
-                f"profit_threshold_pct={profit_threshold_pct:.2f}%, "
-                f"trailing_enabled={trailing_enabled}, effective_trailing_enabled={effective_trailing_enabled}, "
-                f"lock_ratio={lock_ratio}, has_override={has_override}, "
-                f"trail_callback_override={trail_callback_override}"
-            )
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    f"compute_stop_state SHORT: symbol={getattr(position, 'symbol', 'unknown')}, "
+                    f"entry={entry:.4f}, best={best:.4f}, mark={mark:.4f}, "
+                    f"profit_pct(price)={profit_pct:.2f}%, unrealized_pnl_pct={unrealized_pnl_pct}, "
+                    f"profit_pct_for_threshold={profit_pct_for_threshold:.2f}%, profit_pct_based_on_best={profit_pct_based_on_best:.2f}%, "
+                    f"profit_threshold_pct={profit_threshold_pct:.2f}%, "
+                    f"trailing_enabled={trailing_enabled}, effective_trailing_enabled={effective_trailing_enabled}, "
+                    f"lock_ratio={lock_ratio}, has_override={has_override}, "
+                    f"trail_callback_override={trail_callback_override}"
+                )
             
             # Case 1：Dynamic Trailing（鎖利）
             # 關鍵：一旦 best 曾經達到過 threshold，就應該保持在 dynamic mode
@@ -870,8 +1094,8 @@ def compute_stop_state(position: Position, mark_price: float, unrealized_pnl_pct
                 # dynamic_stop_price 基於 best（歷史最低價格）計算，永遠不會上升
                 dynamic_stop_price = entry - (entry - best) * lock_ratio
                 stop_mode = "dynamic"
-                logger.info(f"✓ 進入 Dynamic 模式: dynamic_stop_price={dynamic_stop_price:.4f}, best={best:.4f}, entry={entry:.4f}, lock_ratio={lock_ratio}")
-            else:
+                logger.debug(f"✓ 進入 Dynamic 模式: dynamic_stop_price={dynamic_stop_price:.4f}, best={best:.4f}, entry={entry:.4f}, lock_ratio={lock_ratio}")
+            elif logger.isEnabledFor(logging.DEBUG):
                 # 記錄為什麼沒有進入 dynamic mode
                 reasons = []
                 if not effective_trailing_enabled:
@@ -880,7 +1104,7 @@ def compute_stop_state(position: Position, mark_price: float, unrealized_pnl_pct
                     reasons.append(f"lock_ratio=None (trail_callback_override={trail_callback_override})")
                 if profit_pct_for_threshold < profit_threshold_pct:
                     reasons.append(f"profit_pct_for_threshold({profit_pct_for_threshold:.2f}%) < threshold({profit_threshold_pct:.2f}%)")
-                logger.info(f"✗ 未進入 Dynamic 模式: {', '.join(reasons)}")
+                logger.debug(f"✗ 未進入 Dynamic 模式: {', '.join(reasons)}")
             
             # Case 2：Base Stop-Loss（只有當從未進入過 dynamic mode 時才顯示 base stop）
             # 一旦進入 dynamic mode，就不會返回 base mode
@@ -925,6 +1149,9 @@ async def check_trailing_stop(position: Position, db: Session):
     1. 當 PnL% 達到門檻時，鎖住一部分利潤作為停損線
     2. 否則使用 base stop-loss（固定百分比停損）
     
+    最高/最低價等追蹤欄位的更新只修改物件、不 commit，由呼叫端（trailing_stop_worker）
+    在整輪檢查結束後一次 commit；實際送出平倉單的狀態變更則立即 commit。
+    
     Args:
         position: Position 模型實例
         db: 資料庫 Session
@@ -948,7 +1175,7 @@ async def check_trailing_stop(position: Position, db: Session):
                 client = get_client()
                 positions_info = client.futures_position_information(symbol=position.symbol)
                 for pos_info in positions_info:
-                    position_amt = float(pos_info.get("positionAmt", "0") or 0)
+                    position_amt = _safe_float(pos_info, "positionAmt")
                     if abs(position_amt) < 1e-8:
                         continue
                     
@@ -958,7 +1185,7 @@ async def check_trailing_stop(position: Position, db: Session):
                         continue
                     
                     # 取得 Binance 的 entry price
-                    binance_entry = float(pos_info.get("entryPrice", "0") or 0)
+                    binance_entry = _safe_float(pos_info, "entryPrice")
                     if binance_entry > 0:
                         logger.info(
                             f"從 Binance 取得倉位 {position.id} ({position.symbol}) 的 entry_price: {binance_entry}"
@@ -969,7 +1196,6 @@ async def check_trailing_stop(position: Position, db: Session):
                         if best is None or best <= 0:
                             position.highest_price = current_price
                             best = current_price
-                        db.commit()
                         break
             except Exception as e:
                 logger.error(
@@ -1047,7 +1273,7 @@ async def check_trailing_stop(position: Position, db: Session):
             # 使用 TRAILING_CONFIG 的 lock_ratio（如果有的話），否則使用預設值
             lock_ratio = TRAILING_CONFIG.lock_ratio if TRAILING_CONFIG.lock_ratio is not None else DYN_LOCK_RATIO_DEFAULT
         elif position.trail_callback == 0:
-            logger.info(
+            logger.debug(
                 f"倉位 {position.id} ({position.symbol}) trail_callback=0，僅使用 base stop-loss"
             )
             lock_ratio = None
@@ -1056,15 +1282,16 @@ async def check_trailing_stop(position: Position, db: Session):
             lock_ratio = position.trail_callback
         
         # 記錄使用的停損配置值（用於調試和驗證）
-        logger.info(
-            f"[DynamicStop] pos_id={position.id} symbol={position.symbol} "
-            f"profit_threshold={profit_threshold_pct}% "
-            f"(override={position.dyn_profit_threshold_pct if position.dyn_profit_threshold_pct is not None else 'global'}) "
-            f"lock_ratio={lock_ratio if lock_ratio is not None else 'base-only'} "
-            f"(override={position.trail_callback if position.trail_callback is not None else 'global'}) "
-            f"base_sl={base_sl_pct}% "
-            f"(override={position.base_stop_loss_pct if position.base_stop_loss_pct is not None else 'global'})"
-        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                f"[DynamicStop] pos_id={position.id} symbol={position.symbol} "
+                f"profit_threshold={profit_threshold_pct}% "
+                f"(override={position.dyn_profit_threshold_pct if position.dyn_profit_threshold_pct is not None else 'global'}) "
+                f"lock_ratio={lock_ratio if lock_ratio is not None else 'base-only'} "
+                f"(override={position.trail_callback if position.trail_callback is not None else 'global'}) "
+                f"base_sl={base_sl_pct}% "
+                f"(override={position.base_stop_loss_pct if position.base_stop_loss_pct is not None else 'global'})"
+            )
         
         # 之後再做範圍防呆（只對 >0 的 lock_ratio 做 clamp）
         if lock_ratio is not None:
@@ -1086,7 +1313,6 @@ async def check_trailing_stop(position: Position, db: Session):
                 # 如果還沒有設定最高價，設定為目前價格
                 position.highest_price = current_price
                 logger.info(f"倉位 {position.id} ({position.symbol}) LONG 初始化最高價: {position.highest_price}")
-                db.commit()
                 return
             elif current_price > best:
                 position.highest_price = current_price
@@ -1148,16 +1374,17 @@ async def check_trailing_stop(position: Position, db: Session):
             
             profit_pct = (best - entry) / entry * 100.0 if entry > 0 else 0.0
             
-            # 如果有計算出 dyn_stop，就寫 info log
+            # 如果有計算出 dyn_stop，就寫 debug log（每輪都會執行，不寫 INFO）
             if dyn_stop is not None:
-                logger.info(
-                    f"倉位 {position.id} ({position.symbol}) LONG 模式: {mode}, "
-                    f"目前價格: {mark:.6f}, best: {best:.6f}, dyn_stop: {dyn_stop:.6f}, "
-                    f"獲利%: {profit_pct:.2f}, lock_ratio: {lock_ratio}, base_sl_pct: {base_sl_pct}, "
-                    f"觸發條件: mark <= dyn_stop ({mark:.6f} <= {dyn_stop:.6f} = {mark <= dyn_stop}), "
-                    f"triggered={triggered}, stop_mode={stop_state.stop_mode}, "
-                    f"dynamic_stop_price={stop_state.dynamic_stop_price}, base_stop_price={stop_state.base_stop_price}"
-                )
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(
+                        f"倉位 {position.id} ({position.symbol}) LONG 模式: {mode}, "
+                        f"目前價格: {mark:.6f}, best: {best:.6f}, dyn_stop: {dyn_stop:.6f}, "
+                        f"獲利%: {profit_pct:.2f}, lock_ratio: {lock_ratio}, base_sl_pct: {base_sl_pct}, "
+                        f"觸發條件: mark <= dyn_stop ({mark:.6f} <= {dyn_stop:.6f} = {mark <= dyn_stop}), "
+                        f"triggered={triggered}, stop_mode={stop_state.stop_mode}, "
+                        f"dynamic_stop_price={stop_state.dynamic_stop_price}, base_stop_price={stop_state.base_stop_price}"
+                    )
             else:
                 logger.warning(
                     f"倉位 {position.id} ({position.symbol}) LONG 沒有停損價格！"
@@ -1213,7 +1440,6 @@ async def check_trailing_stop(position: Position, db: Session):
                 position.highest_price = current_price
                 best = current_price  # 更新 best 變數
                 logger.info(f"倉位 {position.id} ({position.symbol}) SHORT 初始化最低價: {best}")
-                db.commit()
                 return
             elif current_price < best:
                 # 如果目前價格更低，更新為新的最低價（創新低）
@@ -1274,14 +1500,15 @@ async def check_trailing_stop(position: Position, db: Session):
             
             profit_pct = (entry - best) / entry * 100.0 if entry > 0 else 0.0
             if dyn_stop is not None:
-                logger.info(
-                    f"倉位 {position.id} ({position.symbol}) SHORT 模式: {mode}, "
-                    f"目前價格: {mark:.6f}, 最低價(best): {best:.6f}, dyn_stop: {dyn_stop:.6f}, "
-                    f"獲利%: {profit_pct:.2f}, lock_ratio: {lock_ratio}, base_sl_pct: {base_sl_pct}, "
-                    f"觸發條件: mark >= dyn_stop ({mark:.6f} >= {dyn_stop:.6f} = {mark >= dyn_stop}), "
-                    f"triggered={triggered}, stop_mode={stop_state.stop_mode}, "
-                    f"dynamic_stop_price={stop_state.dynamic_stop_price}, base_stop_price={stop_state.base_stop_price}"
-                )
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(
+                        f"倉位 {position.id} ({position.symbol}) SHORT 模式: {mode}, "
+                        f"目前價格: {mark:.6f}, 最低價(best): {best:.6f}, dyn_stop: {dyn_stop:.6f}, "
+                        f"獲利%: {profit_pct:.2f}, lock_ratio: {lock_ratio}, base_sl_pct: {base_sl_pct}, "
+                        f"觸發條件: mark >= dyn_stop ({mark:.6f} >= {dyn_stop:.6f} = {mark >= dyn_stop}), "
+                        f"triggered={triggered}, stop_mode={stop_state.stop_mode}, "
+                        f"dynamic_stop_price={stop_state.dynamic_stop_price}, base_stop_price={stop_state.base_stop_price}"
+                    )
             else:
                 logger.warning(
                     f"倉位 {position.id} ({position.symbol}) SHORT 沒有停損價格！"
@@ -1331,8 +1558,6 @@ async def check_trailing_stop(position: Position, db: Session):
         else:
             logger.warning(f"倉位 {position.id} ({position.symbol}) 有未知的方向: {position.side}")
             return
-        
-        db.commit()
     
     except Exception as e:
         logger.error(f"檢查倉位 {position.id} 追蹤停損時發生錯誤: {e}")
@@ -1446,6 +1671,10 @@ class PositionOut(BaseModel):
     stop_mode: Optional[str] = None  # "dynamic", "base", "none"
     base_stop_price: Optional[float] = None
     dynamic_stop_price: Optional[float] = None
+    
+    class Config:
+        from_attributes = True
+        orm_mode = True
 
 
 class TrailingUpdate(BaseModel):
@@ -1552,6 +1781,15 @@ class BotConfigUpdate(BaseModel):
     signal_id: Optional[int] = None
 
 
+# update_bot 的欄位驗證規則：欄位 -> (檢查函式, 錯誤訊息)；值為 None 的欄位不檢查
+_BOT_UPDATE_VALIDATORS = {
+    "max_invest_usdt": (lambda v: v > 0, "max_invest_usdt 必須大於 0"),
+    "qty": (lambda v: v > 0, "qty 必須大於 0（當 max_invest_usdt 未設定時）"),
+    "trailing_callback_percent": (lambda v: 0 <= v <= 100, "trailing_callback_percent 必須在 0~100 之間"),
+    "fixed_side": (lambda v: not v or v in ("BUY", "SELL"), "fixed_side 必須是 BUY 或 SELL"),
+}
+
+
 class BotConfigOut(BotConfigBase):
     """Bot 設定回應格式"""
     id: int
@@ -1564,6 +1802,25 @@ class BotConfigOut(BotConfigBase):
         orm_mode = True
 
 
+class SignalListItem(BaseModel):
+    """Signal 日誌列表項目格式（GET /signals）"""
+    id: int
+    bot_key: Optional[str] = None
+    signal_id: Optional[int] = None
+    symbol: str
+    side: str
+    qty: float
+    position_size: Optional[float] = None
+    received_at: Optional[datetime] = None
+    processed: bool
+    process_result: Optional[str] = None
+    raw_payload: Optional[str] = None
+    
+    class Config:
+        from_attributes = True
+        orm_mode = True
+
+
 class WebhookResponse(BaseModel):
     """Webhook 回應格式"""
     success: bool
@@ -1589,6 +1846,10 @@ TRAILING_CONFIG = TrailingConfig(
     auto_close_enabled=True
 )
 
+# TRAILING_CONFIG 序列化後的 JSON（GET /settings/trailing 直接回傳）
+# 只在 update_trailing_settings 更新設定時重新產生；None 表示尚未產生
+_TRAILING_CONFIG_JSON: Optional[bytes] = None
+
 
 # ==================== 認證依賴 ====================
 
@@ -2190,7 +2451,7 @@ async def webhook_tradingview(
             }
         
         # 1) 先建立 signal log（總是執行）
-        signal_dict = signal.model_dump() if hasattr(signal, 'model_dump') else signal.dict()
+        signal_dict = _model_dump(signal)
         
         # 總是儲存 bot_key（如果請求中有提供），無論使用哪種模式
         bot_key_to_store = signal.bot_key if signal.bot_key else None
@@ -2207,7 +2468,6 @@ async def webhook_tradingview(
         )
         db.add(log)
         db.commit()
-        db.refresh(log)
         
         logger.info(
             f"[TV RAW] signal_log_id={log.id} payload={raw_text}"
@@ -2306,6 +2566,7 @@ async def webhook_tradingview(
                         quantity=formatted_qty,
                         newClientOrderId=client_order_id
                     )
+                    invalidate_position_information_cache()
                     
                     logger.info(f"Bot {bot.id} 成功下單: {order.get('orderId')}")
                     
@@ -2363,7 +2624,6 @@ async def webhook_tradingview(
                     
                     db.add(position)
                     db.commit()
-                    db.refresh(position)
                     
                     results.append(f"bot={bot.id}, position_id={position.id}, mode=order_based")
                     logger.info(f"Bot {bot.id} 成功建立 Position {position.id} (訂單導向)")
@@ -2476,6 +2736,7 @@ async def webhook_tradingview(
                                             quantity=formatted_qty,
                                             newClientOrderId=client_order_id
                                         )
+                                        invalidate_position_information_cache()
                                         
                                         entry_price = float(order.get("avgPrice", 0)) or get_mark_price(symbol) or 0.0
                                         
@@ -2500,7 +2761,6 @@ async def webhook_tradingview(
                                         )
                                         db.add(position)
                                         db.commit()
-                                        db.refresh(position)
                                         
                                         results.append(f"bot={bot.id}, position_id={position.id}, result=rebalance_long")
                                         logger.info(f"Bot {bot.id} 成功調整多倉至 {target_qty}")
@@ -2546,6 +2806,7 @@ async def webhook_tradingview(
                                     quantity=formatted_qty,
                                     newClientOrderId=client_order_id
                                 )
+                                invalidate_position_information_cache()
                                 
                                 entry_price = float(order.get("avgPrice", 0)) or get_mark_price(symbol) or 0.0
                                 
@@ -2570,7 +2831,6 @@ async def webhook_tradingview(
                                 )
                                 db.add(position)
                                 db.commit()
-                                db.refresh(position)
                                 
                                 results.append(f"bot={bot.id}, position_id={position.id}, result=reverse_short_to_long")
                                 logger.info(f"Bot {bot.id} 成功反轉空倉為多倉 {target_qty}")
@@ -2594,6 +2854,7 @@ async def webhook_tradingview(
                                     quantity=formatted_qty,
                                     newClientOrderId=client_order_id
                                 )
+                                invalidate_position_information_cache()
                                 
                                 entry_price = float(order.get("avgPrice", 0)) or get_mark_price(symbol) or 0.0
                                 
@@ -2618,7 +2879,6 @@ async def webhook_tradingview(
                                 )
                                 db.add(position)
                                 db.commit()
-                                db.refresh(position)
                                 
                                 results.append(f"bot={bot.id}, position_id={position.id}, result=open_long")
                                 logger.info(f"Bot {bot.id} 成功開多倉 {target_qty}")
@@ -2674,6 +2934,7 @@ async def webhook_tradingview(
                                             quantity=formatted_qty,
                                             newClientOrderId=client_order_id
                                         )
+                                        invalidate_position_information_cache()
                                         
                                         entry_price = float(order.get("avgPrice", 0)) or get_mark_price(symbol) or 0.0
                                         
@@ -2698,7 +2959,6 @@ async def webhook_tradingview(
                                         )
                                         db.add(position)
                                         db.commit()
-                                        db.refresh(position)
                                         
                                         results.append(f"bot={bot.id}, position_id={position.id}, result=rebalance_short")
                                         logger.info(f"Bot {bot.id} 成功調整空倉至 {target_qty}")
@@ -2742,6 +3002,7 @@ async def webhook_tradingview(
                                     quantity=formatted_qty,
                                     newClientOrderId=client_order_id
                                 )
+                                invalidate_position_information_cache()
                                 
                                 entry_price = float(order.get("avgPrice", 0)) or get_mark_price(symbol) or 0.0
                                 
@@ -2766,7 +3027,6 @@ async def webhook_tradingview(
                                 )
                                 db.add(position)
                                 db.commit()
-                                db.refresh(position)
                                 
                                 results.append(f"bot={bot.id}, position_id={position.id}, result=reverse_long_to_short")
                                 logger.info(f"Bot {bot.id} 成功反轉多倉為空倉 {target_qty}")
@@ -2790,6 +3050,7 @@ async def webhook_tradingview(
                                     quantity=formatted_qty,
                                     newClientOrderId=client_order_id
                                 )
+                                invalidate_position_information_cache()
                                 
                                 entry_price = float(order.get("avgPrice", 0)) or get_mark_price(symbol) or 0.0
                                 
@@ -2814,7 +3075,6 @@ async def webhook_tradingview(
                                 )
                                 db.add(position)
                                 db.commit()
-                                db.refresh(position)
                                 
                                 results.append(f"bot={bot.id}, position_id={position.id}, result=open_short")
                                 logger.info(f"Bot {bot.id} 成功開空倉 {target_qty}")
@@ -2866,6 +3126,45 @@ async def webhook_tradingview(
 
 
 
+# 同時向 Binance 查詢標記價格的最大併發數（避免觸發 API 頻率限制）
+MARK_PRICE_FETCH_CONCURRENCY = int(os.getenv("MARK_PRICE_FETCH_CONCURRENCY", "10"))
+
+
+async def fetch_mark_prices(symbols) -> dict:
+    """
+    併發取得多個交易對的標記價格
+    
+    每個交易對只查詢一次；get_mark_price 是同步的 Binance REST 呼叫，
+    以 asyncio.to_thread 放到執行緒中執行，並用 Semaphore 限制同時進行的請求數。
+    
+    Args:
+        symbols: 交易對集合
+    
+    Returns:
+        dict: {symbol: mark_price}，查詢失敗的交易對值為 None
+    """
+    symbols = list(symbols)
+    if not symbols:
+        return {}
+    
+    semaphore = asyncio.Semaphore(MARK_PRICE_FETCH_CONCURRENCY)
+    
+    async def _fetch_one(sym: str):
+        async with semaphore:
+            return await asyncio.to_thread(get_mark_price, sym)
+    
+    results = await asyncio.gather(*(_fetch_one(sym) for sym in symbols), return_exceptions=True)
+    
+    mark_prices = {}
+    for sym, result in zip(symbols, results):
+        if isinstance(result, Exception):
+            logger.debug(f"取得 {sym} 標記價格失敗: {result}")
+            mark_prices[sym] = None
+        else:
+            mark_prices[sym] = result
+    return mark_prices
+
+
 @app.get("/positions", response_model=List[PositionOut])
 async def get_positions(
     user: dict = Depends(require_admin_user),
@@ -2918,50 +3217,22 @@ async def get_positions(
     
     positions = query.order_by(Position.created_at.desc()).all()
     
+    # 先併發取得所有 OPEN 倉位的標記價格（每個交易對只查詢一次），迴圈內直接查表
+    mark_prices = await fetch_mark_prices({
+        pos.symbol for pos in positions
+        if pos.status == "OPEN" and pos.entry_price and pos.entry_price > 0
+    })
+    
     # 計算每個 position 的實際使用的值和來源標記
+    trailing_config = TRAILING_CONFIG
     result = []
     for pos in positions:
         pos_dict = pos.to_dict()
         
-        # 計算實際使用的值和來源標記
-        # Profit Threshold
-        profit_threshold_value = None
-        profit_threshold_source = None
-        if pos.dyn_profit_threshold_pct is not None:
-            profit_threshold_value = pos.dyn_profit_threshold_pct
-            profit_threshold_source = "override"  # position 的設定視為 override
-        elif TRAILING_CONFIG.profit_threshold_pct is not None:
-            profit_threshold_value = TRAILING_CONFIG.profit_threshold_pct
-            profit_threshold_source = "global"
-        else:
-            profit_threshold_value = DYN_PROFIT_THRESHOLD_PCT
-            profit_threshold_source = "default"
-        
-        # Lock Ratio
-        lock_ratio_value = None
-        lock_ratio_source = None
-        if pos.trail_callback is not None:
-            lock_ratio_value = pos.trail_callback
-            lock_ratio_source = "override"  # position 的設定視為 override
-        elif TRAILING_CONFIG.lock_ratio is not None:
-            lock_ratio_value = TRAILING_CONFIG.lock_ratio
-            lock_ratio_source = "global"
-        else:
-            lock_ratio_value = DYN_LOCK_RATIO_DEFAULT
-            lock_ratio_source = "default"
-        
-        # Base SL%
-        base_sl_value = None
-        base_sl_source = None
-        if pos.base_stop_loss_pct is not None:
-            base_sl_value = pos.base_stop_loss_pct
-            base_sl_source = "override"  # position 的設定視為 override
-        elif TRAILING_CONFIG.base_sl_pct is not None:
-            base_sl_value = TRAILING_CONFIG.base_sl_pct
-            base_sl_source = "global"
-        else:
-            base_sl_value = DYN_BASE_SL_PCT
-            base_sl_source = "default"
+        # 計算實際使用的值和來源標記（position 的設定視為 override）
+        stop_config_fields = resolve_stop_config_fields(
+            pos.dyn_profit_threshold_pct, pos.trail_callback, pos.base_stop_loss_pct, config=trailing_config
+        )
         
         # 計算停損狀態（僅對 OPEN 狀態的倉位）
         stop_mode = None
@@ -2969,8 +3240,8 @@ async def get_positions(
         dynamic_stop_price = None
         if pos.status == "OPEN" and pos.entry_price and pos.entry_price > 0:
             try:
-                # 獲取當前標記價格
-                current_mark_price = get_mark_price(pos.symbol)
+                # 當前標記價格（已在迴圈前取得）
+                current_mark_price = mark_prices.get(pos.symbol)
                 if current_mark_price and current_mark_price > 0:
                     # 計算 unrealized_pnl_pct（PnL%）
                     calculated_unrealized_pnl_pct = None
@@ -3006,13 +3277,8 @@ async def get_positions(
                 logger.debug(f"計算倉位 {pos.id} 的停損狀態失敗: {e}")
         
         # 添加額外字段
+        pos_dict.update(stop_config_fields)
         pos_dict.update({
-            "profit_threshold_value": profit_threshold_value,
-            "profit_threshold_source": profit_threshold_source,
-            "lock_ratio_value": lock_ratio_value,
-            "lock_ratio_source": lock_ratio_source,
-            "base_sl_value": base_sl_value,
-            "base_sl_source": base_sl_source,
             "stop_mode": stop_mode,
             "base_stop_price": base_stop_price,
             "dynamic_stop_price": dynamic_stop_price,
@@ -3061,53 +3327,66 @@ def compute_realized_pnl(position: Position, db: Session = None) -> tuple:
         # 如果還是沒有 exit_price，無法計算 PnL
         return 0.0, 0.0
     
+    # 嘗試從關聯的 Bot 取得 leverage，如果沒有則使用預設值 20（常見的杠桿倍數）
+    leverage = 20  # 預設杠桿倍數
+    if position.bot_id and db is not None:
+        try:
+            from models import BotConfig
+            bot = db.query(BotConfig).filter(BotConfig.id == position.bot_id).first()
+            if bot and bot.leverage:
+                leverage = bot.leverage
+        except Exception as e:
+            logger.debug(f"無法取得倉位 {position.id} 的 Bot leverage: {e}")
+            # 使用預設值 20
+    
     try:
-        entry = float(position.entry_price)
-        exit = float(exit_price)  # 使用處理過的 exit_price
-        qty = float(position.qty)
-        
-        if entry <= 0 or qty <= 0:
-            return 0.0, 0.0
-        
-        # 計算已實現盈虧
-        if position.side == "LONG":
-            realized = (exit - entry) * qty
-        else:  # SHORT
-            realized = (entry - exit) * qty
-        
-        # 計算盈虧百分比（基於保證金，而非名義價值）
-        # PnL% = (Realized PnL / 保證金) * 100
-        # 保證金 = 名義價值 / 杠桿 = (Entry Price * Qty) / Leverage
-        entry_notional = entry * qty
-        
-        # 嘗試從關聯的 Bot 取得 leverage，如果沒有則使用預設值 20（常見的杠桿倍數）
-        leverage = 20  # 預設杠桿倍數
-        if position.bot_id and db is not None:
-            try:
-                from models import BotConfig
-                bot = db.query(BotConfig).filter(BotConfig.id == position.bot_id).first()
-                if bot and bot.leverage:
-                    leverage = bot.leverage
-            except Exception as e:
-                logger.debug(f"無法取得倉位 {position.id} 的 Bot leverage: {e}")
-                # 使用預設值 20
-        
-        if entry_notional > 0 and leverage > 0:
-            margin = entry_notional / leverage
-            if margin > 0:
-                pnl_pct = (realized / margin) * 100.0
-            else:
-                pnl_pct = 0.0
-        else:
-            pnl_pct = 0.0
-        
-        return realized, pnl_pct
+        return compute_realized_pnl_values(position.side, position.entry_price, exit_price, position.qty, leverage)
     except (ValueError, TypeError) as e:
         logger.warning(f"計算倉位 {position.id} 的 PnL 時發生錯誤: {e}")
         return 0.0, 0.0
 
 
-@app.get("/bot-positions/stats")
+def compute_realized_pnl_values(side: str, entry_price: float, exit_price: float, qty: float, leverage: int = 20) -> tuple:
+    """
+    使用純數值計算已實現盈虧和盈虧百分比（不需要 Position 物件或 DB 查詢）
+    
+    Args:
+        side: 倉位方向（LONG / SHORT）
+        entry_price: 開倉價格
+        exit_price: 平倉價格
+        qty: 倉位數量
+        leverage: 杠桿倍數，用於計算保證金
+    
+    Returns:
+        tuple: (realized_pnl, pnl_pct)
+    """
+    entry = float(entry_price)
+    exit = float(exit_price)
+    qty = float(qty)
+    
+    if entry <= 0 or exit <= 0 or qty <= 0:
+        return 0.0, 0.0
+    
+    # 計算已實現盈虧
+    if side == "LONG":
+        realized = (exit - entry) * qty
+    else:  # SHORT
+        realized = (entry - exit) * qty
+    
+    # 計算盈虧百分比（基於保證金，而非名義價值）
+    # PnL% = (Realized PnL / 保證金) * 100
+    # 保證金 = 名義價值 / 杠桿 = (Entry Price * Qty) / Leverage
+    entry_notional = entry * qty
+    if entry_notional > 0 and leverage > 0:
+        margin = entry_notional / leverage
+        pnl_pct = (realized / margin) * 100.0 if margin > 0 else 0.0
+    else:
+        pnl_pct = 0.0
+    
+    return realized, pnl_pct
+
+
+@app.get("/bot-positions/stats", response_class=FastJSONResponse)
 async def get_bot_positions_stats(
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
@@ -3157,6 +3436,7 @@ async def get_bot_positions_stats(
     # 計算每一筆 Position 的 PnL，並更新 exit_price 為 0 的倉位
     pnl_list = []
     valid_positions = []  # 有有效 exit_price 的倉位
+    updated_exit_price_count = 0  # 需要寫回 DB 的 exit_price 數量（迴圈結束後一次 commit）
     for pos in positions:
         # 如果 exit_price 為 0，嘗試從 Binance 查詢並更新
         if (pos.status == "CLOSED" and 
@@ -3172,8 +3452,7 @@ async def get_bot_positions_stats(
                     exit_price = float(order_detail["avgPrice"])
                     if exit_price > 0:
                         pos.exit_price = exit_price
-                        db.add(pos)
-                        db.commit()
+                        updated_exit_price_count += 1
                         logger.info(f"更新倉位 {pos.id} 的 exit_price: {exit_price}")
             except Exception as e:
                 logger.debug(f"查詢倉位 {pos.id} 的訂單詳情失敗: {e}")
@@ -3184,6 +3463,15 @@ async def get_bot_positions_stats(
             pnl_list.append(realized)
             valid_positions.append(pos)
     
+    # 所有 exit_price 的更新在同一個 transaction 中寫入（避免每筆 commit 後整批物件過期重新載入）
+    if updated_exit_price_count:
+        try:
+            db.commit()
+            logger.info(f"已更新 {updated_exit_price_count} 筆倉位的 exit_price")
+        except Exception as e:
+            logger.error(f"寫入 exit_price 更新失敗: {e}")
+            db.rollback()
+    
     # 計算統計數據（只計算有有效 exit_price 的倉位）
     wins = [pnl for pnl in pnl_list if pnl > 0]
     losses = [pnl for pnl in pnl_list if pnl < 0]
@@ -3206,7 +3494,8 @@ async def get_bot_positions_stats(
     else:
         pnl_ratio = None
     
-    return {
+    # 全部是基本型別，直接交給 FastJSONResponse 序列化（略過 jsonable_encoder）
+    return FastJSONResponse(content={
         "start_date": start_date.isoformat(),
         "end_date": end_date.isoformat(),
         "win_count": win_count,
@@ -3216,7 +3505,7 @@ async def get_bot_positions_stats(
         "loss_sum": round(loss_sum, 4),
         "pnl_ratio": round(pnl_ratio, 4) if pnl_ratio is not None else None,
         "total_trades": total_trades,
-    }
+    })
 
 
 @app.get("/bot-positions/export")
@@ -3243,7 +3532,10 @@ async def export_bot_positions_excel(
     """
     try:
         from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
         from openpyxl.styles import Font, Alignment, PatternFill
+        from openpyxl.formatting.rule import CellIsRule
+        from openpyxl.utils import get_column_letter
         
         # 設定預設日期範圍（與 /bot-positions/stats 一致）
         if end_date is None:
@@ -3260,8 +3552,20 @@ async def export_bot_positions_excel(
         start_datetime = datetime.combine(start_date, datetime.min.time()).replace(tzinfo=timezone.utc)
         end_datetime = datetime.combine(end_date + timedelta(days=1), datetime.min.time()).replace(tzinfo=timezone.utc)
         
+        # 直接查詢需要的欄位（tuple），避免為每一筆倉位建立 ORM 物件
         query = (
-            db.query(Position)
+            db.query(
+                Position.id,
+                Position.symbol,
+                Position.side,
+                Position.qty,
+                Position.entry_price,
+                Position.exit_price,
+                Position.exit_reason,
+                Position.created_at,
+                Position.closed_at,
+                Position.bot_id,
+            )
             .filter(Position.status == "CLOSED")
             .filter(Position.closed_at.isnot(None))
             .filter(Position.closed_at >= start_datetime)
@@ -3269,12 +3573,23 @@ async def export_bot_positions_excel(
             .order_by(Position.closed_at.desc())
         )
         
-        positions = query.all()
+        rows = query.all()
+        
+        # 一次取得所有 Bot 的 leverage，避免每筆倉位各查詢一次
+        bot_leverage = {
+            bot_id: leverage
+            for bot_id, leverage in db.query(BotConfig.id, BotConfig.leverage).all()
+            if leverage
+        }
+        
+        # 建立 Excel 工作簿（write-only 模式：逐行串流寫入，不為每個儲存格保留物件）
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Positions")
         
-        # 建立 Excel 工作簿
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Positions"
+        # 調整欄位寬度（write-only 模式下必須在寫入第一行之前設定）
+        column_widths = [8, 12, 8, 10, 12, 12, 12, 10, 15, 20, 20]
+        for col_idx, width in enumerate(column_widths, start=1):
+            ws.column_dimensions[get_column_letter(col_idx)].width = width
         
         # 設定標題樣式
         header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
@@ -3286,58 +3601,92 @@ async def export_bot_positions_excel(
             "ID", "Symbol", "Side", "Qty", "Entry Price", "Exit Price",
             "Realized PnL", "PnL%", "Exit Reason", "Created At", "Closed At"
         ]
-        for col_idx, header in enumerate(headers, start=1):
-            cell = ws.cell(row=1, column=col_idx, value=header)
+        header_cells = []
+        for header in headers:
+            cell = WriteOnlyCell(ws, value=header)
             cell.fill = header_fill
             cell.font = header_font
             cell.alignment = header_alignment
+            header_cells.append(cell)
+        ws.append(header_cells)
         
         # 初始化 row_idx（如果沒有資料，至少從標題行之後開始）
         row_idx = 1
         
+        # 統計數據在寫入資料行時一併累加（每筆倉位只計算一次 realized PnL）
+        win_count = loss_count = 0
+        profit_sum = loss_sum = 0.0
+        
         # 寫入資料行
-        for row_idx, pos in enumerate(positions, start=2):
-            realized, pnl_pct = compute_realized_pnl(pos, db)
-            
-            ws.cell(row=row_idx, column=1, value=pos.id)
-            ws.cell(row=row_idx, column=2, value=pos.symbol)
-            ws.cell(row=row_idx, column=3, value=pos.side)
-            ws.cell(row=row_idx, column=4, value=pos.qty)
-            ws.cell(row=row_idx, column=5, value=pos.entry_price)
-            ws.cell(row=row_idx, column=6, value=pos.exit_price)
-            ws.cell(row=row_idx, column=7, value=round(realized, 4))
-            ws.cell(row=row_idx, column=8, value=round(pnl_pct, 2))
-            ws.cell(row=row_idx, column=9, value=pos.exit_reason or "")
-            ws.cell(row=row_idx, column=10, value=pos.created_at.isoformat() if pos.created_at else "")
-            ws.cell(row=row_idx, column=11, value=pos.closed_at.isoformat() if pos.closed_at else "")
-            
-            # 根據 PnL 設定顏色
+        for row_idx, (pos_id, symbol, side, qty, entry_price, exit_price, exit_reason,
+                      created_at, closed_at, bot_id) in enumerate(rows, start=2):
+            if exit_price and exit_price > 0:
+                try:
+                    realized, pnl_pct = compute_realized_pnl_values(
+                        side, entry_price or 0, exit_price, qty or 0, bot_leverage.get(bot_id, 20)
+                    )
+                except (ValueError, TypeError) as e:
+                    logger.warning(f"計算倉位 {pos_id} 的 PnL 時發生錯誤: {e}")
+                    realized, pnl_pct = 0.0, 0.0
+            else:
+                # 缺少 exit_price 的倉位較少見，載入完整的 Position 讓 compute_realized_pnl 嘗試從 Binance 查詢
+                pos = db.get(Position, pos_id)
+                realized, pnl_pct = compute_realized_pnl(pos, db) if pos else (0.0, 0.0)
+                if pos:
+                    exit_price = pos.exit_price
             if realized > 0:
-                ws.cell(row=row_idx, column=7).fill = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")
+                win_count += 1
+                profit_sum += realized
             elif realized < 0:
-                ws.cell(row=row_idx, column=7).fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
+                loss_count += 1
+                loss_sum += realized
+            
+            ws.append((
+                pos_id,
+                symbol,
+                side,
+                qty,
+                entry_price,
+                exit_price,
+                round(realized, 4),
+                round(pnl_pct, 2),
+                exit_reason or "",
+                created_at.isoformat() if created_at else "",
+                closed_at.isoformat() if closed_at else "",
+            ))
+
+        # 根據 PnL 設定顏色：對整個 PnL 欄位（G 欄）套用一組條件格式，而不是逐格設定 fill
+        if row_idx >= 2:
+            pnl_range = f"G2:G{row_idx}"
+            ws.conditional_formatting.add(
+                pnl_range,
+                CellIsRule(operator="greaterThan", formula=["0"],
+                           fill=PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")),
+            )
+            ws.conditional_formatting.add(
+                pnl_range,
+                CellIsRule(operator="lessThan", formula=["0"],
+                           fill=PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")),
+            )
         
         # 計算統計數據
-        wins = [p for p in positions if compute_realized_pnl(p)[0] > 0]
-        losses = [p for p in positions if compute_realized_pnl(p)[0] < 0]
-        
-        win_count = len(wins)
-        loss_count = len(losses)
         total_trades = win_count + loss_count
         win_rate = (win_count / total_trades * 100.0) if total_trades > 0 else 0.0
-        profit_sum = sum(compute_realized_pnl(p)[0] for p in wins)
-        loss_sum = sum(compute_realized_pnl(p)[0] for p in losses)
         # PnL Ratio = (平均盈利 / 平均虧損)，而不是 (總盈利 / 總虧損)
         average_profit = profit_sum / win_count if win_count > 0 else 0.0
         average_loss = abs(loss_sum) / loss_count if loss_count > 0 else 0.0
         pnl_ratio = average_profit / average_loss if average_loss > 0 else None
         
-        # 在資料下方寫入統計資訊
-        # 如果沒有資料，row_idx 仍然是 1（標題行），所以統計從第 3 行開始
-        # 如果有資料，row_idx 是最後一筆資料的行號，統計從 row_idx + 2 開始
-        stats_row = row_idx + 2
-        ws.cell(row=stats_row, column=1, value="Stats").font = Font(bold=True)
-        stats_row += 1
+        # 在資料下方寫入統計資訊（空一行後開始）
+        bold_font = Font(bold=True)
+        
+        def bold_cell(value):
+            cell = WriteOnlyCell(ws, value=value)
+            cell.font = bold_font
+            return cell
+        
+        ws.append([])
+        ws.append([bold_cell("Stats")])
         
         stats_data = [
             ("Start Date", start_date.isoformat()),
@@ -3351,14 +3700,8 @@ async def export_bot_positions_excel(
             ("PnL Ratio", round(pnl_ratio, 4) if pnl_ratio is not None else "N/A"),
         ]
         
-        for stat_row_idx, (label, value) in enumerate(stats_data, start=stats_row):
-            ws.cell(row=stat_row_idx, column=1, value=label).font = Font(bold=True)
-            ws.cell(row=stat_row_idx, column=2, value=value)
-        
-        # 調整欄位寬度
-        column_widths = [8, 12, 8, 10, 12, 12, 12, 10, 15, 20, 20]
-        for col_idx, width in enumerate(column_widths, start=1):
-            ws.column_dimensions[ws.cell(row=1, column=col_idx).column_letter].width = width
+        for label, value in stats_data:
+            ws.append([bold_cell(label), value])
         
         # 將工作簿寫入記憶體
         output = io.BytesIO()
@@ -3386,7 +3729,7 @@ async def export_bot_positions_excel(
         raise HTTPException(status_code=500, detail=f"匯出失敗: {str(e)}")
 
 
-@app.get("/binance/open-positions")
+@app.get("/binance/open-positions", response_class=FastJSONResponse)
 async def get_binance_open_positions(
     user: dict = Depends(require_admin_user),
     db: Session = Depends(get_db)
@@ -3421,38 +3764,47 @@ async def get_binance_open_positions(
         # 嘗試取得 Binance client
         client = get_client()
         
-        # 使用 USDT-M Futures position info
-        raw_positions = client.futures_position_information()
+        # 使用 USDT-M Futures position info（短期快取，與其他呼叫端共用）
+        raw_positions = get_all_position_information(client)
         
-        positions = []
+        # 先掃描一次，把持倉不為 0 的部位和已關閉的部位分開
+        # Binance 會回傳所有交易對（大多數 positionAmt 為 0），主迴圈只需要處理持倉中的部位
+        active_positions = []
+        closed_symbols = []
         for item in raw_positions:
-            # 只保留持倉不為 0 的部位
             try:
-                position_amt = float(item.get("positionAmt", "0") or 0)
+                position_amt = _safe_float(item, "positionAmt")
             except (ValueError, TypeError):
                 position_amt = 0.0
             
-            if position_amt == 0:
-                # 當 position 關閉時（position_amt == 0），清理追蹤記錄
-                symbol_for_cleanup = item.get("symbol", "")
-                if symbol_for_cleanup:
-                    # 清理對應的追蹤記錄
-                    for side_cleanup in ["LONG", "SHORT"]:
-                        tracking_key_cleanup = f"{symbol_for_cleanup}|{side_cleanup}"
-                        if tracking_key_cleanup in _non_bot_position_tracking:
-                            del _non_bot_position_tracking[tracking_key_cleanup]
-                            logger.debug(f"清理非 bot 倉位追蹤記錄: {tracking_key_cleanup}")
+            if position_amt != 0:
+                active_positions.append((item, position_amt))
+            elif _non_bot_position_tracking:
+                closed_symbols.append(item.get("symbol", ""))
+        
+        # 當 position 關閉時（position_amt == 0），清理對應的追蹤記錄
+        for symbol_for_cleanup in closed_symbols:
+            if not symbol_for_cleanup:
                 continue
-            
-            # 解析其他欄位（必須在 position_amt != 0 之後）
-            
+            for side_cleanup in ("LONG", "SHORT"):
+                if _non_bot_position_tracking.pop((symbol_for_cleanup, side_cleanup), None) is not None:
+                    logger.debug("清理非 bot 倉位追蹤記錄: %s|%s", symbol_for_cleanup, side_cleanup)
+        
+        # 迴圈前先讀出全局停損設定，迴圈內直接使用區域變數
+        trailing_config = TRAILING_CONFIG
+        cfg_base_sl_pct = trailing_config.base_sl_pct
+        fallback_base_sl_pct = cfg_base_sl_pct if cfg_base_sl_pct is not None else DYN_BASE_SL_PCT
+        stop_overrides = _binance_position_stop_overrides
+        
+        positions = []
+        for item, position_amt in active_positions:
             # 解析其他欄位
             try:
-                entry_price = float(item.get("entryPrice", "0") or 0)
-                mark_price = float(item.get("markPrice", "0") or 0)
-                unrealized_pnl = float(item.get("unRealizedProfit", "0") or 0)
-                leverage = int(float(item.get("leverage", "0") or 0))
-                isolated_wallet = float(item.get("isolatedWallet", "0") or 0)
+                entry_price = _safe_float(item, "entryPrice")
+                mark_price = _safe_float(item, "markPrice")
+                unrealized_pnl = _safe_float(item, "unRealizedProfit")
+                leverage = int(_safe_float(item, "leverage"))
+                isolated_wallet = _safe_float(item, "isolatedWallet")
                 update_time = int(item.get("updateTime", 0) or 0)
             except (ValueError, TypeError) as e:
                 logger.warning(f"解析 Binance position 欄位失敗: {item.get('symbol', 'unknown')}, 錯誤: {e}")
@@ -3464,16 +3816,12 @@ async def get_binance_open_positions(
             # 計算 unrealized PnL 百分比（基於保證金，而非名義價值）
             # PnL% = (Unrealized PnL / 保證金) * 100
             # 保證金 = 名義價值 / 杠桿 = (Position Size * Entry Price) / Leverage
-            unrealized_pnl_pct = None
-            if entry_price > 0 and abs(position_amt) > 0 and leverage > 0:
-                notional = abs(position_amt) * entry_price
-                if notional > 0:
-                    # 計算保證金
-                    margin = notional / leverage
-                    if margin > 0:
-                        # PnL% = (Unrealized PnL / 保證金) * 100
-                        unrealized_pnl_pct = (unrealized_pnl / margin) * 100.0
+            # 每筆倉位只計算一次，後續停損計算直接重用 abs_amt 和 unrealized_pnl_pct
+            abs_amt = abs(position_amt)
+            notional = abs_amt * entry_price
+            margin = (notional / leverage) if (leverage > 0 and notional > 0) else 0.0
             # 如果無法計算（例如 leverage = 0），unrealized_pnl_pct 保持為 None
+            unrealized_pnl_pct = (unrealized_pnl / margin * 100.0) if margin > 0 else None
             
             # 計算停損資訊：查找對應的本地 Position
             stop_mode = "none"
@@ -3482,6 +3830,10 @@ async def get_binance_open_positions(
             
             # 決定本地 Position 的 side
             side_local = "LONG" if position_amt > 0 else "SHORT"
+            # 追蹤記錄與停損覆寫共用同一個 (symbol, side) key
+            position_key = (symbol, side_local)
+            # 停損配置覆寫值（Binance Live Positions 的覆寫優先於本地 Position），每筆倉位只查詢一次
+            overrides = stop_overrides.get(position_key, _NO_STOP_OVERRIDE)
             
             # 查找匹配的本地 Position（最新的 OPEN 倉位）
             # 注意：這個查詢在 try 塊外執行，確保 local_pos 在後續代碼中可用
@@ -3497,16 +3849,17 @@ async def get_binance_open_positions(
                 .first()
             )
             
-            # 調試日誌：記錄匹配結果
-            if local_pos:
-                logger.debug(
-                    f"Binance position {symbol} ({side_local}) 匹配到本地 Position ID={local_pos.id}, "
-                    f"entry_price={local_pos.entry_price}, highest_price={local_pos.highest_price}"
-                )
-            else:
-                logger.debug(
-                    f"Binance position {symbol} ({side_local}) 沒有匹配的本地 Position（可能是手動開倉）"
-                )
+            # 調試日誌：記錄匹配結果（DEBUG 未啟用時不建立字串）
+            if logger.isEnabledFor(logging.DEBUG):
+                if local_pos:
+                    logger.debug(
+                        f"Binance position {symbol} ({side_local}) 匹配到本地 Position ID={local_pos.id}, "
+                        f"entry_price={local_pos.entry_price}, highest_price={local_pos.highest_price}"
+                    )
+                else:
+                    logger.debug(
+                        f"Binance position {symbol} ({side_local}) 沒有匹配的本地 Position（可能是手動開倉）"
+                    )
             
             try:
                 
@@ -3517,61 +3870,56 @@ async def get_binance_open_positions(
                 if local_pos:
                     # 找到匹配的本地 Position（bot 創建的倉位）
                     logger.debug(
-                        f"Binance Live Position {symbol} ({side_local}) 匹配到本地 Position ID={local_pos.id}"
+                        "Binance Live Position %s (%s) 匹配到本地 Position ID=%s",
+                        symbol, side_local, local_pos.id
                     )
-                    # 檢查是否有停損配置覆寫值（Binance Live Positions 的覆寫優先於本地 Position）
-                    override_key = f"{symbol}|{side_local}"
-                    overrides = _binance_position_stop_overrides.get(override_key, {})
-                    
                     # 如果本地 Position 的 entry_price 無效，使用 Binance 的 entryPrice 作為 fallback
                     if local_pos.entry_price <= 0 and entry_price > 0:
                         logger.warning(
                             f"本地倉位 {local_pos.id} ({symbol}) entry_price={local_pos.entry_price} 無效，"
                             f"使用 Binance entryPrice={entry_price} 作為 fallback 計算停損"
                         )
-                        # 建立一個臨時的 Position 物件用於計算
-                        from copy import copy
-                        temp_pos = copy(local_pos)
-                        temp_pos.entry_price = entry_price
-                        # 如果 highest_price 也無效，使用當前 mark_price
-                        if temp_pos.highest_price is None or temp_pos.highest_price <= 0:
-                            temp_pos.highest_price = mark_price
-                        # 應用覆寫值（如果存在）
-                        if overrides.get("dyn_profit_threshold_pct") is not None:
-                            temp_pos.dyn_profit_threshold_pct = overrides["dyn_profit_threshold_pct"]
-                        if overrides.get("base_stop_loss_pct") is not None:
-                            temp_pos.base_stop_loss_pct = overrides["base_stop_loss_pct"]
-                        if overrides.get("trail_callback") is not None:
-                            temp_pos.trail_callback = overrides["trail_callback"]
-                        # 計算 unrealized_pnl_pct（PnL%）用於判斷是否進入 dynamic mode
-                        # 對於 bot 創建的 position，需要計算 PnL%
-                        calculated_unrealized_pnl_pct = None
-                        if entry_price > 0 and abs(position_amt) > 0 and leverage > 0:
-                            notional = abs(position_amt) * entry_price
-                            if notional > 0:
-                                margin = notional / leverage
-                                if margin > 0:
-                                    calculated_unrealized_pnl_pct = (unrealized_pnl / margin) * 100.0
-                        stop_state = compute_stop_state(temp_pos, mark_price, calculated_unrealized_pnl_pct, leverage, abs(position_amt))
+                        # 建立一個輕量的臨時物件用於計算（只帶 compute_stop_state 需要的欄位，
+                        # 避免複製整個 ORM 實例及其 InstanceState）
+                        # 如果 highest_price 也無效，使用當前 mark_price；覆寫值（如果存在）優先
+                        temp_pos = SimpleNamespace(
+                            id=local_pos.id,
+                            symbol=local_pos.symbol,
+                            entry_price=entry_price,
+                            side=local_pos.side,
+                            highest_price=(
+                                local_pos.highest_price
+                                if local_pos.highest_price is not None and local_pos.highest_price > 0
+                                else mark_price
+                            ),
+                            dyn_profit_threshold_pct=(
+                                overrides.dyn_profit_threshold_pct
+                                if overrides.dyn_profit_threshold_pct is not None
+                                else local_pos.dyn_profit_threshold_pct
+                            ),
+                            base_stop_loss_pct=(
+                                overrides.base_stop_loss_pct
+                                if overrides.base_stop_loss_pct is not None
+                                else local_pos.base_stop_loss_pct
+                            ),
+                            trail_callback=(
+                                overrides.trail_callback
+                                if overrides.trail_callback is not None
+                                else local_pos.trail_callback
+                            ),
+                        )
+                        # 使用已計算的 unrealized_pnl_pct（PnL%）來判斷是否進入 dynamic mode
+                        stop_state = compute_stop_state(temp_pos, mark_price, unrealized_pnl_pct, leverage, abs_amt)
                     else:
                         # 應用覆寫值（如果存在）
-                        if overrides.get("dyn_profit_threshold_pct") is not None:
-                            local_pos.dyn_profit_threshold_pct = overrides["dyn_profit_threshold_pct"]
-                        if overrides.get("base_stop_loss_pct") is not None:
-                            local_pos.base_stop_loss_pct = overrides["base_stop_loss_pct"]
-                        if overrides.get("trail_callback") is not None:
-                            local_pos.trail_callback = overrides["trail_callback"]
-                        # 計算 unrealized_pnl_pct（PnL%）用於判斷是否進入 dynamic mode
-                        # 對於 bot 創建的 position，需要計算 PnL%
-                        calculated_unrealized_pnl_pct = None
-                        if entry_price > 0 and abs(position_amt) > 0 and leverage > 0:
-                            notional = abs(position_amt) * entry_price
-                            if notional > 0:
-                                margin = notional / leverage
-                                if margin > 0:
-                                    calculated_unrealized_pnl_pct = (unrealized_pnl / margin) * 100.0
+                        if overrides.dyn_profit_threshold_pct is not None:
+                            local_pos.dyn_profit_threshold_pct = overrides.dyn_profit_threshold_pct
+                        if overrides.base_stop_loss_pct is not None:
+                            local_pos.base_stop_loss_pct = overrides.base_stop_loss_pct
+                        if overrides.trail_callback is not None:
+                            local_pos.trail_callback = overrides.trail_callback
                         # 使用 compute_stop_state 計算停損狀態（傳入 leverage 和 qty）
-                        stop_state = compute_stop_state(local_pos, mark_price, calculated_unrealized_pnl_pct, leverage, abs(position_amt))
+                        stop_state = compute_stop_state(local_pos, mark_price, unrealized_pnl_pct, leverage, abs_amt)
                     stop_mode = stop_state.stop_mode
                     base_stop_price = stop_state.base_stop_price
                     dynamic_stop_price = stop_state.dynamic_stop_price
@@ -3580,108 +3928,79 @@ async def get_binance_open_positions(
                     # 關鍵：使用記憶體中的追蹤記錄來維持歷史最高/最低價格
                     # 這樣即使當前價格下跌，dynamic stop 也能保持穩定
                     logger.debug(
-                        f"Binance Live Position {symbol} ({side_local}) 沒有匹配的本地 Position（非 bot 創建）"
+                        "Binance Live Position %s (%s) 沒有匹配的本地 Position（非 bot 創建）",
+                        symbol, side_local
                     )
                     
-                    # 建立追蹤 key：使用 symbol 和 side 來唯一標識一個 position
-                    tracking_key = f"{symbol}|{side_local}"
-                    
-                    # 檢查是否有停損配置覆寫值（在檢查追蹤記錄之前）
-                    override_key = f"{symbol}|{side_local}"
-                    overrides = _binance_position_stop_overrides.get(override_key, {})
-                    
                     # 檢查是否已有追蹤記錄
-                    if tracking_key in _non_bot_position_tracking:
-                        tracked = _non_bot_position_tracking[tracking_key]
-                        tracked_entry = tracked.get("entry_price")
-                        tracked_highest = tracked.get("highest_price")
-                        tracked_side = tracked.get("side")
-                        
+                    track = _non_bot_position_tracking.get(position_key)
+                    if track is None:
+                        # 首次看到這個 position，初始化追蹤
+                        track = _start_non_bot_track(position_key, entry_price, side_local)
+                    elif track.entry_price is None or (abs(track.entry_price - entry_price) / max(abs(track.entry_price), abs(entry_price), 1.0)) > 0.001:
                         # 如果 entry_price 改變（可能是同一個 symbol 但不同的 position），重置追蹤
                         # 使用相對誤差而不是絕對誤差，避免小數點精度問題
-                        if tracked_entry is None or (abs(tracked_entry - entry_price) / max(abs(tracked_entry), abs(entry_price), 1.0)) > 0.001:
-                            logger.debug(
-                                f"非 bot 倉位 {symbol} ({side_local}) entry_price 改變："
-                                f"舊={tracked_entry}, 新={entry_price}，重置追蹤記錄"
-                            )
-                            tracked_entry = entry_price
-                            tracked_highest = None
-                            tracked_side = side_local
-                    else:
-                        # 首次看到這個 position，初始化追蹤
-                        tracked_entry = entry_price
-                        tracked_highest = None
-                        tracked_side = side_local
+                        logger.debug(
+                            "非 bot 倉位 %s (%s) entry_price 改變：舊=%s, 新=%s，重置追蹤記錄",
+                            symbol, side_local, track.entry_price, entry_price
+                        )
+                        track.entry_price = entry_price
+                        track.highest_price = None
+                        track.side = side_local
                     
-                    # 更新歷史最高/最低價格（只能上升/下降，不能回退）
+                    # 更新歷史最高/最低價格（只能上升/下降，不能回退；直接修改追蹤記錄）
                     if side_local == "LONG":
                         # LONG：highest_price 只能上升，不能下降
-                        if tracked_highest is None:
-                            tracked_highest = max(mark_price, entry_price) if entry_price > 0 else mark_price
+                        if track.highest_price is None:
+                            track.highest_price = max(mark_price, entry_price) if entry_price > 0 else mark_price
                         else:
                             # 只能更新為更高的價格
-                            tracked_highest = max(tracked_highest, mark_price)
+                            track.highest_price = max(track.highest_price, mark_price)
                     else:
                         # SHORT：highest_price 欄位實際存儲的是最低價格，只能下降，不能上升
-                        if tracked_highest is None:
-                            tracked_highest = min(mark_price, entry_price) if entry_price > 0 else mark_price
+                        if track.highest_price is None:
+                            track.highest_price = min(mark_price, entry_price) if entry_price > 0 else mark_price
                         else:
                             # 只能更新為更低的價格
-                            tracked_highest = min(tracked_highest, mark_price)
-                    
-                    # 確保 tracked_highest 不為 None（使用當前 mark_price 作為 fallback）
-                    if tracked_highest is None:
-                        tracked_highest = mark_price
+                            track.highest_price = min(track.highest_price, mark_price)
                     
-                    # 更新追蹤記錄
-                    _non_bot_position_tracking[tracking_key] = {
-                        "entry_price": tracked_entry,
-                        "highest_price": tracked_highest,
-                        "side": tracked_side
-                    }
+                    tracked_entry = track.entry_price
+                    tracked_highest = track.highest_price
                     
                     # 建立臨時 Position 物件
-                    class TempPosition:
-                        def __init__(self, entry_price, side, highest_price=None):
-                            self.entry_price = entry_price
-                            self.side = side
-                            self.highest_price = highest_price  # LONG: 最高價, SHORT: 最低價
-                            # 使用覆寫值（如果存在），否則使用 None（會使用全局配置）
-                            self.trail_callback = overrides.get("trail_callback")
-                            self.dyn_profit_threshold_pct = overrides.get("dyn_profit_threshold_pct")
-                            self.base_stop_loss_pct = overrides.get("base_stop_loss_pct")
-                    
                     temp_pos = TempPosition(
                         entry_price=tracked_entry if tracked_entry else entry_price,  # 使用追蹤的 entry_price（更準確）
                         side=side_local,
-                        highest_price=tracked_highest  # 使用追蹤的歷史最高/最低價格
+                        highest_price=tracked_highest,  # 使用追蹤的歷史最高/最低價格
+                        trail_callback=overrides.trail_callback,
+                        dyn_profit_threshold_pct=overrides.dyn_profit_threshold_pct,
+                        base_stop_loss_pct=overrides.base_stop_loss_pct,
+                        symbol=symbol,
                     )
                     # 使用已計算的 unrealized_pnl_pct（PnL%）來判斷是否進入 dynamic mode（傳入 leverage 和 qty）
-                    stop_state = compute_stop_state(temp_pos, mark_price, unrealized_pnl_pct, leverage, abs(position_amt))
+                    stop_state = compute_stop_state(temp_pos, mark_price, unrealized_pnl_pct, leverage, abs_amt)
                     stop_mode = stop_state.stop_mode
                     base_stop_price = stop_state.base_stop_price
                     dynamic_stop_price = stop_state.dynamic_stop_price
                     
                     # 調試日誌：記錄非 bot 創建的 position 的停損計算結果
-                    # 使用 info 級別以便追蹤問題
-                    # 計算 profit_pct 用於調試
-                    profit_pct_debug = ((tracked_highest - tracked_entry) / tracked_entry * 100.0) if (tracked_entry and tracked_entry > 0 and tracked_highest) else 0.0
-                    # 安全地格式化可能為 None 的值
-                    tracked_highest_str = f"{tracked_highest:.4f}" if tracked_highest else "None"
-                    base_stop_str = f"{base_stop_price:.4f}" if base_stop_price else "None"
-                    dynamic_stop_str = f"{dynamic_stop_price:.4f}" if dynamic_stop_price else "None"
-                    logger.info(
-                        f"非 bot 創建的倉位 {symbol} ({side_local}) 停損計算："
-                        f"entry={entry_price:.4f}, mark={mark_price:.4f}, "
-                        f"tracked_highest={tracked_highest_str}, "
-                        f"profit_pct={profit_pct_debug:.2f}%, "
-                        f"trail_callback={temp_pos.trail_callback}, "
-                        f"dyn_profit_threshold_pct={temp_pos.dyn_profit_threshold_pct}, "
-                        f"overrides={overrides}, "
-                        f"stop_mode={stop_mode}, "
-                        f"base_stop={base_stop_str}, "
-                        f"dynamic_stop={dynamic_stop_str}"
-                    )
+                    # 使用 info 級別以便追蹤問題；INFO 未啟用時跳過除錯字串的計算
+                    if logger.isEnabledFor(logging.INFO):
+                        # 計算 profit_pct 用於調試
+                        profit_pct_debug = ((tracked_highest - tracked_entry) / tracked_entry * 100.0) if (tracked_entry and tracked_entry > 0 and tracked_highest) else 0.0
+                        # 安全地格式化可能為 None 的值
+                        tracked_highest_str = f"{tracked_highest:.4f}" if tracked_highest else "None"
+                        base_stop_str = f"{base_stop_price:.4f}" if base_stop_price else "None"
+                        dynamic_stop_str = f"{dynamic_stop_price:.4f}" if dynamic_stop_price else "None"
+                        logger.info(
+                            "非 bot 創建的倉位 %s (%s) 停損計算："
+                            "entry=%.4f, mark=%.4f, tracked_highest=%s, profit_pct=%.2f%%, "
+                            "trail_callback=%s, dyn_profit_threshold_pct=%s, overrides=%s, "
+                            "stop_mode=%s, base_stop=%s, dynamic_stop=%s",
+                            symbol, side_local, entry_price, mark_price, tracked_highest_str,
+                            profit_pct_debug, temp_pos.trail_callback, temp_pos.dyn_profit_threshold_pct,
+                            overrides, stop_mode, base_stop_str, dynamic_stop_str
+                        )
                 
             except Exception as e:
                 # 如果計算停損狀態失敗，記錄警告和完整的堆疊追蹤
@@ -3689,7 +4008,7 @@ async def get_binance_open_positions(
                 # 即使計算失敗，也嘗試使用基本配置計算 base stop（如果有配置）
                 try:
                     # 使用全局配置嘗試計算 base stop
-                    base_sl_pct = TRAILING_CONFIG.base_sl_pct if TRAILING_CONFIG.base_sl_pct is not None else DYN_BASE_SL_PCT
+                    base_sl_pct = fallback_base_sl_pct
                     if base_sl_pct > 0 and entry_price > 0:
                         if side_local == "LONG":
                             base_stop_price = entry_price * (1 - base_sl_pct / 100.0)
@@ -3708,26 +4027,6 @@ async def get_binance_open_positions(
                     base_stop_price = None
                     dynamic_stop_price = None
             
-            # 檢查是否有停損配置覆寫值（用於前端顯示）
-            # override_key 應該已經在 try 塊中定義（兩個分支都會定義）
-            if 'override_key' not in locals():
-                override_key = f"{symbol}|{side_local}"
-            overrides = _binance_position_stop_overrides.get(override_key, {})
-            
-            # 確保 local_pos 已定義（在 try 塊外已定義，但如果 try 塊失敗，需要重新查找）
-            if 'local_pos' not in locals():
-                # 如果沒有在 try 塊中定義，重新查找
-                local_pos = (
-                    db.query(Position)
-                    .filter(
-                        Position.symbol == symbol,
-                        Position.side == side_local,
-                        Position.status == "OPEN",
-                    )
-                    .order_by(Position.id.desc())
-                    .first()
-                )
-            
             # 計算實際使用的值和來源標記
             # 優先順序：override (手動設定) > local_pos (bot position 設定，也視為 override) > global (全局設定) > default (默認值)
             # 來源標記：
@@ -3735,53 +4034,13 @@ async def get_binance_open_positions(
             #   "global" - 全局設定（藍色）
             #   "default" - 默認值（灰色）
             
-            # Profit Threshold (dyn_profit_threshold_pct)
-            profit_threshold_value = None
-            profit_threshold_source = None
-            if overrides.get("dyn_profit_threshold_pct") is not None:
-                profit_threshold_value = overrides["dyn_profit_threshold_pct"]
-                profit_threshold_source = "override"
-            elif local_pos and local_pos.dyn_profit_threshold_pct is not None:
-                profit_threshold_value = local_pos.dyn_profit_threshold_pct
-                profit_threshold_source = "override"  # bot position 的設定也視為 override
-            elif TRAILING_CONFIG.profit_threshold_pct is not None:
-                profit_threshold_value = TRAILING_CONFIG.profit_threshold_pct
-                profit_threshold_source = "global"
-            else:
-                profit_threshold_value = DYN_PROFIT_THRESHOLD_PCT
-                profit_threshold_source = "default"
-            
-            # Lock Ratio (trail_callback)
-            lock_ratio_value = None
-            lock_ratio_source = None
-            if overrides.get("trail_callback") is not None:
-                lock_ratio_value = overrides["trail_callback"]
-                lock_ratio_source = "override"
-            elif local_pos and local_pos.trail_callback is not None:
-                lock_ratio_value = local_pos.trail_callback
-                lock_ratio_source = "override"  # bot position 的設定也視為 override
-            elif TRAILING_CONFIG.lock_ratio is not None:
-                lock_ratio_value = TRAILING_CONFIG.lock_ratio
-                lock_ratio_source = "global"
-            else:
-                lock_ratio_value = DYN_LOCK_RATIO_DEFAULT
-                lock_ratio_source = "default"
-            
-            # Base SL% (base_stop_loss_pct)
-            base_sl_value = None
-            base_sl_source = None
-            if overrides.get("base_stop_loss_pct") is not None:
-                base_sl_value = overrides["base_stop_loss_pct"]
-                base_sl_source = "override"
-            elif local_pos and local_pos.base_stop_loss_pct is not None:
-                base_sl_value = local_pos.base_stop_loss_pct
-                base_sl_source = "override"  # bot position 的設定也視為 override
-            elif TRAILING_CONFIG.base_sl_pct is not None:
-                base_sl_value = TRAILING_CONFIG.base_sl_pct
-                base_sl_source = "global"
-            else:
-                base_sl_value = DYN_BASE_SL_PCT
-                base_sl_source = "default"
+            stop_config_fields = resolve_stop_config_fields(
+                overrides.dyn_profit_threshold_pct,
+                overrides.trail_callback,
+                overrides.base_stop_loss_pct,
+                local_pos,
+                config=trailing_config,
+            )
             
             # 確保所有欄位都包含在回應中，無資料時使用 null
             positions.append({
@@ -3799,16 +4058,12 @@ async def get_binance_open_positions(
                 "base_stop_price": round(base_stop_price, 4) if base_stop_price is not None and base_stop_price > 0 else None,  # 無資料時為 null，保留 4 位小數
                 "dynamic_stop_price": round(dynamic_stop_price, 4) if dynamic_stop_price is not None and dynamic_stop_price > 0 else None,  # 無資料時為 null，保留 4 位小數
                 # 添加停損配置覆寫值（用於前端顯示，保留原始覆寫值）
-                "dyn_profit_threshold_pct": overrides.get("dyn_profit_threshold_pct"),
-                "base_stop_loss_pct": overrides.get("base_stop_loss_pct"),
-                "trail_callback": overrides.get("trail_callback"),
+                "dyn_profit_threshold_pct": overrides.dyn_profit_threshold_pct,
+                "base_stop_loss_pct": overrides.base_stop_loss_pct,
+                "trail_callback": overrides.trail_callback,
                 # 添加實際使用的值和來源標記（用於前端顯示和顏色標記）
-                "profit_threshold_value": profit_threshold_value,
-                "profit_threshold_source": profit_threshold_source,  # "override", "local", "global", "default"
-                "lock_ratio_value": lock_ratio_value,
-                "lock_ratio_source": lock_ratio_source,  # "override", "local", "global", "default"
-                "base_sl_value": base_sl_value,
-                "base_sl_source": base_sl_source,  # "override", "local", "global", "default"
+                # *_source: "override", "global", "default"
+                **stop_config_fields,
                 # 添加標識：是否為 bot 創建的倉位（用於前端顯示和區分）
                 "is_bot_position": local_pos is not None,
                 "bot_position_id": local_pos.id if local_pos else None,
@@ -3818,7 +4073,8 @@ async def get_binance_open_positions(
             f"取得 Binance open positions: {len(positions)} 筆 "
             f"(包含 bot 創建的倉位和手動創建的倉位)"
         )
-        return positions
+        # 直接回傳 Response，略過 FastAPI 的 jsonable_encoder（內容只有基本型別）
+        return FastJSONResponse(content=positions)
         
     except ValueError as e:
         # API Key/Secret 未設定
@@ -3837,18 +4093,70 @@ async def get_binance_open_positions(
         )
 
 
-@app.post("/binance/positions/close")
+def _persist_manual_close_position(
+    symbol: str,
+    position_side: str,
+    qty: float,
+    entry_price: float,
+    exit_price: float,
+    binance_order_id: Optional[int],
+    client_order_id: Optional[str],
+):
+    """
+    為手動關閉的 Binance Live Position 建立已平倉的 Position 記錄（用於統計計算）。
+    
+    在回應送出後以 BackgroundTasks 執行，使用獨立的 DB Session；
+    Binance 上的訂單才是實際結果，這筆記錄只是衍生資料，寫入失敗只記錄錯誤。
+    """
+    db = SessionLocal()
+    try:
+        # 只新增一筆 CLOSED 記錄，不查找/更新既有的 OPEN 倉位，因此沒有 read-modify-write 競態；
+        # 同一 symbol/side 可同時存在多個 bot 的 OPEN 倉位，不能以 (symbol, side) 建唯一索引做 UPSERT
+        position = Position(
+            bot_id=None,  # 非 bot 創建的倉位
+            tv_signal_log_id=None,  # 非 bot 創建的倉位
+            symbol=symbol,
+            side=position_side,
+            qty=qty,
+            entry_price=entry_price if entry_price > 0 else exit_price,  # 如果 entry_price 無效，使用 exit_price 作為 fallback
+            exit_price=exit_price,
+            status="CLOSED",
+            closed_at=datetime.now(timezone.utc),
+            exit_reason="manual_close",  # 手動關閉
+            binance_order_id=binance_order_id,
+            client_order_id=client_order_id,
+        )
+        
+        db.add(position)
+        db.commit()
+        
+        logger.info(
+            "非 bot 創建倉位 %s (%s) 已建立資料庫記錄 "
+            "(position_id=%s, exit_reason=manual_close, exit_price=%s)",
+            symbol, position_side, position.id, exit_price,
+        )
+    except Exception as e:
+        logger.error("建立非 bot 創建倉位 %s (%s) 資料庫記錄失敗: %s", symbol, position_side, e)
+        db.rollback()
+    finally:
+        db.close()
+
+
+@app.post("/binance/positions/close", response_class=FastJSONResponse)
 async def close_binance_live_position(
     payload: BinanceCloseRequest,
+    background_tasks: BackgroundTasks,
     user: dict = Depends(require_admin_user),
-    db: Session = Depends(get_db)
 ):
     """
     關閉 Binance Live Position（不屬於 bot 管理的倉位）。
     僅限已登入的管理員使用。
     
+    平倉的 Position 記錄會在回應送出後於背景寫入資料庫。
+    
     Args:
         payload: 關倉請求（包含 symbol 和 position_side）
+        background_tasks: 用於在回應後寫入 Position 記錄
         user: 管理員使用者資訊（由 Depends(require_admin_user) 自動驗證）
     
     Returns:
@@ -3875,7 +4183,7 @@ async def close_binance_live_position(
         position_info = positions[0]
         
         try:
-            position_amt = float(position_info.get("positionAmt", "0") or 0)
+            position_amt = _safe_float(position_info, "positionAmt")
         except (ValueError, TypeError):
             position_amt = 0.0
         
@@ -3912,7 +4220,7 @@ async def close_binance_live_position(
         timestamp = int(time.time() * 1000)
         client_order_id = f"TVBOT_CLOSE_LIVE_{timestamp}"
         
-        logger.info(f"關閉 Binance Live Position: {symbol} {position_side}，數量: {qty}, 下單方向: {side}")
+        logger.info("關閉 Binance Live Position: %s %s，數量: %s, 下單方向: %s", symbol, position_side, qty, side)
         
         # 建立市價單關倉
         order = client.futures_create_order(
@@ -3923,74 +4231,53 @@ async def close_binance_live_position(
             reduceOnly=True,  # 設定為只減倉，確保是平倉單
             newClientOrderId=client_order_id
         )
+        invalidate_position_information_cache()
         
-        logger.info(f"成功關閉 Binance Live Position: {symbol}，訂單ID: {order.get('orderId')}")
+        logger.info("成功關閉 Binance Live Position: %s，訂單ID: %s", symbol, order.get("orderId"))
         
         # 取得平倉價格
         exit_price = get_exit_price_from_order(order, symbol)
         
         # 取得 entry_price（從 Binance position info）
-        entry_price = float(position_info.get("entryPrice", "0") or 0)
+        entry_price = _safe_float(position_info, "entryPrice")
         if entry_price <= 0:
             # 如果 entry_price 無效，嘗試從追蹤記錄取得
-            tracking_key = f"{symbol}|{position_side}"
-            if tracking_key in _non_bot_position_tracking:
-                tracked_entry = _non_bot_position_tracking[tracking_key].get("entry_price")
-                if tracked_entry and tracked_entry > 0:
-                    entry_price = tracked_entry
+            track = _non_bot_position_tracking.get((symbol, position_side))
+            if track is not None and track.entry_price and track.entry_price > 0:
+                entry_price = track.entry_price
         
-        # 建立 Position 記錄（用於統計計算）
-        try:
-            position = Position(
-                bot_id=None,  # 非 bot 創建的倉位
-                tv_signal_log_id=None,  # 非 bot 創建的倉位
-                symbol=symbol.upper(),
-                side=position_side,
-                qty=qty,
-                entry_price=entry_price if entry_price > 0 else exit_price,  # 如果 entry_price 無效，使用 exit_price 作為 fallback
-                exit_price=exit_price,
-                status="CLOSED",
-                closed_at=datetime.now(timezone.utc),
-                exit_reason="manual_close",  # 手動關閉
-                binance_order_id=int(order.get("orderId")) if order.get("orderId") else None,
-                client_order_id=order.get("clientOrderId"),
-            )
-            
-            db.add(position)
-            db.commit()
-            db.refresh(position)
-            
-            logger.info(
-                f"非 bot 創建倉位 {symbol} ({position_side}) 已建立資料庫記錄 "
-                f"(position_id={position.id}, exit_reason=manual_close, exit_price={exit_price})"
-            )
-            
-            # 清理追蹤記錄
-            tracking_key = f"{symbol}|{position_side}"
-            if tracking_key in _non_bot_position_tracking:
-                del _non_bot_position_tracking[tracking_key]
-                logger.debug(f"清理非 bot 倉位追蹤記錄: {tracking_key}")
-            
-        except Exception as e:
-            logger.error(f"建立非 bot 創建倉位 {symbol} ({position_side}) 資料庫記錄失敗: {e}")
-            db.rollback()
+        # 建立 Position 記錄（用於統計計算）：在回應送出後於背景寫入
+        background_tasks.add_task(
+            _persist_manual_close_position,
+            symbol=symbol,
+            position_side=position_side,
+            qty=qty,
+            entry_price=entry_price,
+            exit_price=exit_price,
+            binance_order_id=int(order.get("orderId")) if order.get("orderId") else None,
+            client_order_id=order.get("clientOrderId"),
+        )
+        
+        # 清理追蹤記錄
+        if _non_bot_position_tracking.pop((symbol, position_side), None) is not None:
+            logger.debug("清理非 bot 倉位追蹤記錄: %s|%s", symbol, position_side)
         
         # 返回關鍵資訊
-        return {
+        return FastJSONResponse(content={
             "success": True,
             "symbol": symbol,
             "position_side": position_side,
             "order_id": order.get("orderId"),
             "client_order_id": order.get("clientOrderId"),
-            "executed_qty": float(order.get("executedQty", 0) or 0),
-            "avg_price": float(order.get("avgPrice", 0) or 0),
+            "executed_qty": _safe_float(order, "executedQty"),
+            "avg_price": _safe_float(order, "avgPrice"),
             "status": order.get("status"),
-        }
+        })
         
     except HTTPException:
         raise
     except ValueError as e:
-        logger.error(f"Binance API 設定錯誤: {e}")
+        logger.error("Binance API 設定錯誤: %s", e)
         raise HTTPException(
             status_code=400,
             detail=f"Binance API 未設定: {str(e)}。請在環境變數中設定 BINANCE_API_KEY 和 BINANCE_API_SECRET。"
@@ -4017,7 +4304,12 @@ async def get_trailing_settings(
     Returns:
         TrailingConfig: 目前的 Trailing 設定
     """
-    return TRAILING_CONFIG
+    global _TRAILING_CONFIG_JSON
+    
+    # 回傳快取的 JSON，避免每次 GET 都重新序列化 TRAILING_CONFIG
+    if _TRAILING_CONFIG_JSON is None:
+        _TRAILING_CONFIG_JSON = _model_dump_json(TRAILING_CONFIG).encode()
+    return Response(content=_TRAILING_CONFIG_JSON, media_type="application/json")
 
 
 @app.post("/settings/trailing", response_model=TrailingConfig)
@@ -4039,64 +4331,54 @@ async def update_trailing_settings(
     Raises:
         HTTPException: 當設定值無效時
     """
-    global TRAILING_CONFIG
+    global TRAILING_CONFIG, _TRAILING_CONFIG_JSON
     
-    # 使用 dict() 方法（Pydantic v1/v2 兼容）
-    if hasattr(TRAILING_CONFIG, 'model_dump'):
-        updated = TRAILING_CONFIG.model_dump()
-    else:
-        updated = TRAILING_CONFIG.dict()
-    
-    if hasattr(payload, 'model_dump'):
-        data = payload.model_dump(exclude_unset=True)
-    else:
-        data = payload.dict(exclude_unset=True)
+    # Pydantic v1/v2 兼容
+    data = _model_dump(payload, exclude_unset=True)
     
     # Force trailing_enabled and auto_close_enabled to always be True
     data['trailing_enabled'] = True
     data['auto_close_enabled'] = True
     
     # 範圍防呆：比對 blofin_test.py 的邏輯
-    if "lock_ratio" in data:
-        if data["lock_ratio"] is not None and data["lock_ratio"] < 0:
+    for key in ("lock_ratio", "profit_threshold_pct", "base_sl_pct"):
+        value = data.get(key)
+        if value is not None and value < 0:
             raise HTTPException(
                 status_code=400,
-                detail="lock_ratio 不能小於 0"
+                detail=f"{key} 不能小於 0"
             )
-        if data["lock_ratio"] is not None and data["lock_ratio"] > 1:
-            logger.warning(f"lock_ratio > 1（值={data['lock_ratio']}），已強制調整為 1.0")
-            data["lock_ratio"] = 1.0
     
-    if "profit_threshold_pct" in data:
-        if data["profit_threshold_pct"] is not None and data["profit_threshold_pct"] < 0:
-            raise HTTPException(
-                status_code=400,
-                detail="profit_threshold_pct 不能小於 0"
-            )
-    
-    if "base_sl_pct" in data:
-        if data["base_sl_pct"] is not None and data["base_sl_pct"] < 0:
-            raise HTTPException(
-                status_code=400,
-                detail="base_sl_pct 不能小於 0"
-            )
-    
-    # 更新設定
-    updated.update(data)
-    TRAILING_CONFIG = TrailingConfig(**updated)
+    lock_ratio = data.get("lock_ratio")
+    if lock_ratio is not None and lock_ratio > 1:
+        logger.warning("lock_ratio > 1（值=%s），已強制調整為 1.0", lock_ratio)
+        data["lock_ratio"] = 1.0
+    
+    # 更新設定：只複製並覆寫有提供的欄位（值已由 TrailingConfigUpdate 驗證過），
+    # 不需要把整個設定 dump 成 dict 再重新驗證所有欄位；明確傳入 null 的欄位維持原值
+    # 只保留實際有變更的欄位；沒有任何變更時直接回傳目前設定（不重建設定、不重新產生 JSON 快取）
+    changes = {
+        key: value for key, value in data.items()
+        if value is not None and getattr(TRAILING_CONFIG, key) != value
+    }
+    if not changes:
+        logger.debug("Trailing 設定沒有變更，略過更新")
+        return TRAILING_CONFIG
     
-    # 使用兼容的序列化方法
-    if hasattr(TRAILING_CONFIG, 'model_dump_json'):
-        config_json = TRAILING_CONFIG.model_dump_json()
+    if PYDANTIC_V2:
+        TRAILING_CONFIG = TRAILING_CONFIG.model_copy(update=changes)
     else:
-        import json
-        config_json = json.dumps(TRAILING_CONFIG.dict())
+        TRAILING_CONFIG = TRAILING_CONFIG.copy(update=changes)
+    
+    # 使用兼容的序列化方法（同時更新 GET /settings/trailing 的快取）
+    config_json = _model_dump_json(TRAILING_CONFIG)
+    _TRAILING_CONFIG_JSON = config_json.encode()
     
-    logger.info(f"更新 Trailing 設定: {config_json}")
+    logger.info("更新 Trailing 設定: %s", config_json)
     return TRAILING_CONFIG
 
 
-@app.get("/signals", response_model=List[dict])
+@app.get("/signals", response_model=List[SignalListItem])
 async def list_signals(
     limit: int = 50,
     db: Session = Depends(get_db),
@@ -4113,30 +4395,28 @@ async def list_signals(
         user: 管理員使用者資訊（由 Depends(require_admin_user) 自動驗證）
     
     Returns:
-        List[dict]: Signal 日誌列表
+        List[SignalListItem]: Signal 日誌列表
     """
+    # 只查詢列表需要的欄位（不載入 raw_body 等大型 JSON 欄位，也不建立 ORM 物件）
     q = (
-        db.query(TradingViewSignalLog)
+        db.query(
+            TradingViewSignalLog.id,
+            TradingViewSignalLog.bot_key,
+            TradingViewSignalLog.signal_id,
+            TradingViewSignalLog.symbol,
+            TradingViewSignalLog.side,
+            TradingViewSignalLog.qty,
+            TradingViewSignalLog.position_size,
+            TradingViewSignalLog.received_at,
+            TradingViewSignalLog.processed,
+            TradingViewSignalLog.process_result,
+            TradingViewSignalLog.raw_payload,
+        )
         .order_by(TradingViewSignalLog.id.desc())
         .limit(limit)
     )
-    rows = q.all()
-    return [
-        {
-            "id": r.id,
-            "bot_key": r.bot_key,
-            "signal_id": r.signal_id,
-            "symbol": r.symbol,
-            "side": r.side,
-            "qty": r.qty,
-            "position_size": r.position_size,
-            "received_at": r.received_at.isoformat() if r.received_at else None,
-            "processed": r.processed,
-            "process_result": r.process_result,
-            "raw_payload": r.raw_payload,
-        }
-        for r in rows
-    ]
+    # 直接回傳查詢結果，由 SignalListItem（from_attributes）轉換
+    return q.all()
 
 
 @app.get("/signals/{signal_id}", response_model=dict)
@@ -4161,7 +4441,7 @@ async def get_signal_detail(
     Raises:
         HTTPException: 當 Signal 不存在時
     """
-    signal = db.query(TradingViewSignalLog).filter(TradingViewSignalLog.id == signal_id).first()
+    signal = db.get(TradingViewSignalLog, signal_id)
     if not signal:
         raise HTTPException(status_code=404, detail="Signal not found")
     
@@ -4175,7 +4455,7 @@ async def get_signal_detail(
         "position_size": signal.position_size,
         "raw_body": signal.raw_body,
         "raw_payload": signal.raw_payload,
-        "received_at": signal.received_at.isoformat() if signal.received_at else None,
+        "received_at": signal.received_at,
         "processed": signal.processed,
         "process_result": signal.process_result,
     }
@@ -4200,11 +4480,8 @@ async def list_signal_configs(
     Returns:
         List[TVSignalConfigOut]: Signal Config 列表
     """
-    configs = db.query(TVSignalConfig).order_by(TVSignalConfig.id.desc()).all()
-    return [
-        TVSignalConfigOut.model_validate(c) if hasattr(TVSignalConfigOut, 'model_validate') else TVSignalConfigOut.from_orm(c)
-        for c in configs
-    ]
+    # 直接回傳 ORM 物件，由 response_model 轉換一次即可，不需要先逐筆 model_validate
+    return db.query(TVSignalConfig).order_by(TVSignalConfig.id.desc()).all()
 
 
 @app.post("/signal-configs", response_model=TVSignalConfigOut)
@@ -4246,11 +4523,10 @@ async def create_signal_config(
     
     db.add(db_config)
     db.commit()
-    db.refresh(db_config)
     
     logger.info(f"建立 Signal Config: {db_config.id} ({db_config.name}, signal_key={db_config.signal_key})")
     
-    return TVSignalConfigOut.model_validate(db_config) if hasattr(TVSignalConfigOut, 'model_validate') else TVSignalConfigOut.from_orm(db_config)
+    return _model_from_orm(TVSignalConfigOut, db_config)
 
 
 @app.get("/signal-configs/{signal_id}", response_model=TVSignalConfigOut)
@@ -4275,11 +4551,11 @@ async def get_signal_config(
     Raises:
         HTTPException: 當 Signal Config 不存在時
     """
-    config = db.query(TVSignalConfig).filter(TVSignalConfig.id == signal_id).first()
+    config = db.get(TVSignalConfig, signal_id)
     if not config:
         raise HTTPException(status_code=404, detail=f"Signal Config {signal_id} 不存在")
     
-    return TVSignalConfigOut.model_validate(config) if hasattr(TVSignalConfigOut, 'model_validate') else TVSignalConfigOut.from_orm(config)
+    return _model_from_orm(TVSignalConfigOut, config)
 
 
 @app.put("/signal-configs/{signal_id}", response_model=TVSignalConfigOut)
@@ -4306,7 +4582,7 @@ async def update_signal_config(
     Raises:
         HTTPException: 當 Signal Config 不存在或 signal_key 已存在時
     """
-    config = db.query(TVSignalConfig).filter(TVSignalConfig.id == signal_id).first()
+    config = db.get(TVSignalConfig, signal_id)
     if not config:
         raise HTTPException(status_code=404, detail=f"Signal Config {signal_id} 不存在")
     
@@ -4317,7 +4593,7 @@ async def update_signal_config(
             raise HTTPException(status_code=400, detail=f"signal_key '{config_update.signal_key}' 已存在")
     
     # 取得更新資料
-    update_data = config_update.model_dump(exclude_unset=True) if hasattr(config_update, 'model_dump') else config_update.dict(exclude_unset=True)
+    update_data = _model_dump(config_update, exclude_unset=True)
     
     # 更新欄位
     for key, value in update_data.items():
@@ -4325,11 +4601,10 @@ async def update_signal_config(
             setattr(config, key, value)
     
     db.commit()
-    db.refresh(config)
     
     logger.info(f"更新 Signal Config: {config.id} ({config.name})")
     
-    return TVSignalConfigOut.model_validate(config) if hasattr(TVSignalConfigOut, 'model_validate') else TVSignalConfigOut.from_orm(config)
+    return _model_from_orm(TVSignalConfigOut, config)
 
 
 @app.delete("/signal-configs/{signal_id}")
@@ -4357,7 +4632,7 @@ async def delete_signal_config(
     Raises:
         HTTPException: 當 Signal Config 不存在或仍有關聯的 Bots 時
     """
-    config = db.query(TVSignalConfig).filter(TVSignalConfig.id == signal_id).first()
+    config = db.get(TVSignalConfig, signal_id)
     if not config:
         raise HTTPException(status_code=404, detail=f"Signal Config {signal_id} 不存在")
     
@@ -4377,7 +4652,49 @@ async def delete_signal_config(
     return {"success": True, "message": f"Signal Config {signal_id} 已刪除"}
 
 
-@app.get("/bots", response_model=List[BotConfigOut])
+def _signal_config_out_dict(signal_config: TVSignalConfig) -> dict:
+    """將 TVSignalConfig 轉為 TVSignalConfigOut 格式的 dict（可直接以 FastJSONResponse 序列化）"""
+    return {
+        "id": signal_config.id,
+        "name": signal_config.name,
+        "signal_key": signal_config.signal_key,
+        "description": signal_config.description,
+        "symbol_hint": signal_config.symbol_hint,
+        "timeframe_hint": signal_config.timeframe_hint,
+        "enabled": signal_config.enabled,
+        "created_at": signal_config.created_at,
+        "updated_at": signal_config.updated_at,
+    }
+
+
+def _bot_out_dict(bot: BotConfig, signal_config: Optional[TVSignalConfig] = None) -> dict:
+    """
+    將 BotConfig 轉為 BotConfigOut 格式的 dict（包含關聯的 signal）
+    
+    手動構建，避免 relationship 序列化問題；資料直接來自資料庫欄位，不經過 Pydantic 驗證。
+    """
+    return {
+        "id": bot.id,
+        "name": bot.name,
+        "bot_key": bot.bot_key,
+        "enabled": bot.enabled,
+        "symbol": bot.symbol,
+        "use_signal_side": bot.use_signal_side,
+        "fixed_side": bot.fixed_side,
+        "qty": bot.qty,
+        "max_invest_usdt": bot.max_invest_usdt,
+        "leverage": bot.leverage,
+        "use_dynamic_stop": bot.use_dynamic_stop,
+        "trailing_callback_percent": bot.trailing_callback_percent,
+        "base_stop_loss_pct": bot.base_stop_loss_pct,
+        "signal_id": bot.signal_id,
+        "created_at": bot.created_at,
+        "updated_at": bot.updated_at,
+        "signal": _signal_config_out_dict(signal_config) if signal_config else None,
+    }
+
+
+@app.get("/bots", response_model=List[BotConfigOut], response_class=FastJSONResponse)
 async def list_bots(
     db: Session = Depends(get_db),
     user: dict = Depends(require_admin_user)
@@ -4394,54 +4711,21 @@ async def list_bots(
     Returns:
         List[BotConfigOut]: Bot 設定列表（包含關聯的 Signal Config 資訊）
     """
-    bots = db.query(BotConfig).order_by(BotConfig.id.desc()).all()
-    result = []
-    for bot in bots:
-        # 載入關聯的 signal（如果有的話）
-        signal_config_obj = None
-        if bot.signal_id:
-            signal_config_obj = db.query(TVSignalConfig).filter(TVSignalConfig.id == bot.signal_id).first()
-        
-        # 手動構建 BotConfigOut，避免 relationship 序列化問題
-        bot_out_dict = {
-            "id": bot.id,
-            "name": bot.name,
-            "bot_key": bot.bot_key,
-            "enabled": bot.enabled,
-            "symbol": bot.symbol,
-            "use_signal_side": bot.use_signal_side,
-            "fixed_side": bot.fixed_side,
-            "qty": bot.qty,
-            "max_invest_usdt": bot.max_invest_usdt,
-            "leverage": bot.leverage,
-            "use_dynamic_stop": bot.use_dynamic_stop,
-            "trailing_callback_percent": bot.trailing_callback_percent,
-            "base_stop_loss_pct": bot.base_stop_loss_pct,
-            "signal_id": bot.signal_id,
-            "created_at": bot.created_at,
-            "updated_at": bot.updated_at,
-        }
-        bot_out = BotConfigOut(**bot_out_dict)
-        
-        if signal_config_obj:
-            signal_dict = {
-                "id": signal_config_obj.id,
-                "name": signal_config_obj.name,
-                "signal_key": signal_config_obj.signal_key,
-                "description": signal_config_obj.description,
-                "symbol_hint": signal_config_obj.symbol_hint,
-                "timeframe_hint": signal_config_obj.timeframe_hint,
-                "enabled": signal_config_obj.enabled,
-                "created_at": signal_config_obj.created_at,
-                "updated_at": signal_config_obj.updated_at,
-            }
-            bot_out.signal = TVSignalConfigOut(**signal_dict)
-        
-        result.append(bot_out)
-    return result
+    # 使用 selectinload 一次載入所有關聯的 signal（避免每個 bot 各查詢一次）
+    bots = (
+        db.query(BotConfig)
+        .options(selectinload(BotConfig.signal))
+        .order_by(BotConfig.id.desc())
+        .all()
+    )
+    # 關聯的 signal（如果有的話）已由 selectinload 載入
+    return FastJSONResponse(content=[
+        _bot_out_dict(bot, bot.signal if bot.signal_id else None)
+        for bot in bots
+    ])
 
 
-@app.post("/bots", response_model=BotConfigOut)
+@app.post("/bots", response_model=BotConfigOut, response_class=FastJSONResponse)
 async def create_bot(
     bot: BotConfigCreate,
     db: Session = Depends(get_db),
@@ -4493,6 +4777,7 @@ async def create_bot(
         raise HTTPException(status_code=400, detail=f"bot_key '{bot.bot_key}' 已存在")
     
     # 如果提供了 signal_id，驗證 Signal Config 存在且 enabled
+    signal_config = None
     if bot.signal_id is not None:
         signal_config = db.query(TVSignalConfig).filter(TVSignalConfig.id == bot.signal_id).first()
         if not signal_config:
@@ -4520,63 +4805,17 @@ async def create_bot(
     try:
         db.add(db_bot)
         db.commit()
-        db.refresh(db_bot)
         logger.info(f"建立 Bot 設定: {db_bot.id} ({db_bot.name}, bot_key={db_bot.bot_key}, signal_id={db_bot.signal_id}, max_invest_usdt={db_bot.max_invest_usdt})")
     except Exception as e:
         db.rollback()
         logger.error(f"建立 Bot 時發生資料庫錯誤: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"建立 Bot 時發生資料庫錯誤: {str(e)}")
     
-    # 載入關聯的 signal（如果有的話）
-    signal_config_obj = None
-    if db_bot.signal_id:
-        signal_config_obj = db.query(TVSignalConfig).filter(TVSignalConfig.id == db_bot.signal_id).first()
-    
-    # 構建回應，包含 signal 資訊
-    # 直接手動構建，避免 relationship 序列化問題
-    try:
-        bot_out_dict = {
-            "id": db_bot.id,
-            "name": db_bot.name,
-            "bot_key": db_bot.bot_key,
-            "enabled": db_bot.enabled,
-            "symbol": db_bot.symbol,
-            "use_signal_side": db_bot.use_signal_side,
-            "fixed_side": db_bot.fixed_side,
-            "qty": db_bot.qty,
-            "max_invest_usdt": db_bot.max_invest_usdt,
-            "leverage": db_bot.leverage,
-            "use_dynamic_stop": db_bot.use_dynamic_stop,
-            "trailing_callback_percent": db_bot.trailing_callback_percent,
-            "base_stop_loss_pct": db_bot.base_stop_loss_pct,
-            "signal_id": db_bot.signal_id,
-            "created_at": db_bot.created_at,
-            "updated_at": db_bot.updated_at,
-        }
-        bot_out = BotConfigOut(**bot_out_dict)
-        
-        # 如果 signal 存在，添加到回應中
-        if signal_config_obj:
-            signal_dict = {
-                "id": signal_config_obj.id,
-                "name": signal_config_obj.name,
-                "signal_key": signal_config_obj.signal_key,
-                "description": signal_config_obj.description,
-                "symbol_hint": signal_config_obj.symbol_hint,
-                "timeframe_hint": signal_config_obj.timeframe_hint,
-                "enabled": signal_config_obj.enabled,
-                "created_at": signal_config_obj.created_at,
-                "updated_at": signal_config_obj.updated_at,
-            }
-            bot_out.signal = TVSignalConfigOut(**signal_dict)
-    except Exception as e:
-        logger.error(f"構建 BotConfigOut 回應時發生錯誤: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"建立 Bot 成功，但序列化回應時發生錯誤: {str(e)}")
-    
-    return bot_out
+    # 構建回應，包含 signal 資訊（關聯的 signal 已在上方驗證時載入，直接重用）
+    return FastJSONResponse(content=_bot_out_dict(db_bot, signal_config))
 
 
-@app.get("/bots/{bot_id}", response_model=BotConfigOut)
+@app.get("/bots/{bot_id}", response_model=BotConfigOut, response_class=FastJSONResponse)
 async def get_bot(
     bot_id: int,
     db: Session = Depends(get_db),
@@ -4598,54 +4837,18 @@ async def get_bot(
     Raises:
         HTTPException: 當 Bot 不存在時
     """
-    bot = db.query(BotConfig).filter(BotConfig.id == bot_id).first()
+    # 以 joinedload 在同一個查詢中載入關聯的 signal
+    bot = db.get(BotConfig, bot_id, options=[joinedload(BotConfig.signal)])
     if not bot:
         raise HTTPException(status_code=404, detail=f"Bot {bot_id} 不存在")
     
-    # 載入關聯的 signal（如果有的話）
-    signal_config_obj = None
-    if bot.signal_id:
-        signal_config_obj = db.query(TVSignalConfig).filter(TVSignalConfig.id == bot.signal_id).first()
+    signal_config_obj = bot.signal if bot.signal_id else None
     
-    # 構建回應，包含 signal 資訊
-    bot_out_dict = {
-        "id": bot.id,
-        "name": bot.name,
-        "bot_key": bot.bot_key,
-        "enabled": bot.enabled,
-        "symbol": bot.symbol,
-        "use_signal_side": bot.use_signal_side,
-        "fixed_side": bot.fixed_side,
-        "qty": bot.qty,
-        "max_invest_usdt": bot.max_invest_usdt,
-        "leverage": bot.leverage,
-        "use_dynamic_stop": bot.use_dynamic_stop,
-        "trailing_callback_percent": bot.trailing_callback_percent,
-        "base_stop_loss_pct": bot.base_stop_loss_pct,
-        "signal_id": bot.signal_id,
-        "created_at": bot.created_at,
-        "updated_at": bot.updated_at,
-    }
-    bot_out = BotConfigOut(**bot_out_dict)
-    
-    if signal_config_obj:
-        signal_dict = {
-            "id": signal_config_obj.id,
-            "name": signal_config_obj.name,
-            "signal_key": signal_config_obj.signal_key,
-            "description": signal_config_obj.description,
-            "symbol_hint": signal_config_obj.symbol_hint,
-            "timeframe_hint": signal_config_obj.timeframe_hint,
-            "enabled": signal_config_obj.enabled,
-            "created_at": signal_config_obj.created_at,
-            "updated_at": signal_config_obj.updated_at,
-        }
-        bot_out.signal = TVSignalConfigOut(**signal_dict)
-    
-    return bot_out
+    # 構建回應，包含 signal 資訊；資料直接來自資料庫欄位，直接序列化回傳，不經過 response_model 驗證
+    return FastJSONResponse(content=_bot_out_dict(bot, signal_config_obj))
 
 
-@app.put("/bots/{bot_id}", response_model=BotConfigOut)
+@app.put("/bots/{bot_id}", response_model=BotConfigOut, response_class=FastJSONResponse)
 async def update_bot(
     bot_id: int,
     bot_update: BotConfigUpdate,
@@ -4669,97 +4872,89 @@ async def update_bot(
     Raises:
         HTTPException: 當 Bot 不存在或設定值無效時
     """
-    bot = db.query(BotConfig).filter(BotConfig.id == bot_id).first()
+    # 以 joinedload 在同一個查詢中載入關聯的 signal
+    bot = db.get(BotConfig, bot_id, options=[joinedload(BotConfig.signal)])
     if not bot:
         raise HTTPException(status_code=404, detail=f"Bot {bot_id} 不存在")
     
-    # 取得更新資料
-    update_data = bot_update.model_dump(exclude_unset=True) if hasattr(bot_update, 'model_dump') else bot_update.dict(exclude_unset=True)
-    
-    # 驗證
-    if "max_invest_usdt" in update_data and update_data["max_invest_usdt"] is not None:
-        if update_data["max_invest_usdt"] <= 0:
-            raise HTTPException(status_code=400, detail="max_invest_usdt 必須大於 0")
-    if "qty" in update_data and update_data["qty"] is not None and update_data["qty"] <= 0:
-        raise HTTPException(status_code=400, detail="qty 必須大於 0（當 max_invest_usdt 未設定時）")
-    
-    if "trailing_callback_percent" in update_data and update_data["trailing_callback_percent"] is not None:
-        if update_data["trailing_callback_percent"] < 0 or update_data["trailing_callback_percent"] > 100:
-            raise HTTPException(status_code=400, detail="trailing_callback_percent 必須在 0~100 之間")
+    # 取得更新資料；沒有任何欄位時直接回傳目前設定，不寫入資料庫
+    update_data = _model_dump(bot_update, exclude_unset=True)
+    if not update_data:
+        return FastJSONResponse(content=_bot_out_dict(bot, bot.signal if bot.signal_id else None))
     
     # 如果 use_signal_side=True，則自動將 fixed_side=None
     if update_data.get("use_signal_side") is True:
         update_data["fixed_side"] = None
     
     # 如果 fixed_side 有值，轉成大寫
-    if "fixed_side" in update_data and update_data["fixed_side"]:
+    if update_data.get("fixed_side"):
         update_data["fixed_side"] = update_data["fixed_side"].upper()
-        if update_data["fixed_side"] not in ["BUY", "SELL"]:
-            raise HTTPException(status_code=400, detail="fixed_side 必須是 BUY 或 SELL")
+    
+    # 驗證（規則見 _BOT_UPDATE_VALIDATORS）
+    for key, value in update_data.items():
+        rule = _BOT_UPDATE_VALIDATORS.get(key)
+        if rule is not None and value is not None and not rule[0](value):
+            raise HTTPException(status_code=400, detail=rule[1])
     
     # 如果更新 signal_id，驗證 Signal Config 存在且 enabled
+    # 整列仍會用於回應，因此以 db.get 取得：與目前關聯的 signal 相同時直接命中 identity map，不發出查詢
     if "signal_id" in update_data and update_data["signal_id"] is not None:
-        signal_config = db.query(TVSignalConfig).filter(TVSignalConfig.id == update_data["signal_id"]).first()
+        signal_config = db.get(TVSignalConfig, update_data["signal_id"])
         if not signal_config:
             raise HTTPException(status_code=404, detail=f"找不到 signal_id={update_data['signal_id']} 的 Signal Config")
         if not signal_config.enabled:
             raise HTTPException(status_code=400, detail=f"Signal Config {update_data['signal_id']} 未啟用，無法關聯到此 Bot")
     
-    # 更新
+    # 關聯的 signal（如果有的話）：更新 signal_id 時使用驗證階段載入的 signal，否則使用 joinedload 載入的 signal
+    if "signal_id" in update_data and update_data["signal_id"] is not None:
+        signal_config_obj = signal_config
+    else:
+        signal_config_obj = bot.signal if bot.signal_id else None
+    
+    # 更新（只寫入實際有變更的欄位）
+    changed = False
     for key, value in update_data.items():
-        if value is not None:
+        if value is not None and getattr(bot, key) != value:
             setattr(bot, key, value)
+            changed = True
+    
+    if not changed:
+        logger.debug(f"Bot {bot.id} 設定沒有變更，略過更新")
+        return FastJSONResponse(content=_bot_out_dict(bot, signal_config_obj))
     
     # 自動更新 updated_at（SQLAlchemy 的 onupdate 會處理，但我們確保一下）
-    from datetime import datetime, timezone
     bot.updated_at = datetime.now(timezone.utc)
     
     db.commit()
-    db.refresh(bot)
-    
-    # 載入關聯的 signal（如果有的話）
-    signal_config_obj = None
-    if bot.signal_id:
-        signal_config_obj = db.query(TVSignalConfig).filter(TVSignalConfig.id == bot.signal_id).first()
     
     logger.info(f"更新 Bot 設定: {bot.id} ({bot.name}, signal_id={bot.signal_id})")
     
-    # 構建回應，包含 signal 資訊
-    bot_out_dict = {
-        "id": bot.id,
-        "name": bot.name,
-        "bot_key": bot.bot_key,
-        "enabled": bot.enabled,
-        "symbol": bot.symbol,
-        "use_signal_side": bot.use_signal_side,
-        "fixed_side": bot.fixed_side,
-        "qty": bot.qty,
-        "max_invest_usdt": bot.max_invest_usdt,
-        "leverage": bot.leverage,
-        "use_dynamic_stop": bot.use_dynamic_stop,
-        "trailing_callback_percent": bot.trailing_callback_percent,
-        "base_stop_loss_pct": bot.base_stop_loss_pct,
-        "signal_id": bot.signal_id,
-        "created_at": bot.created_at,
-        "updated_at": bot.updated_at,
-    }
-    bot_out = BotConfigOut(**bot_out_dict)
-    
-    if signal_config_obj:
-        signal_dict = {
-            "id": signal_config_obj.id,
-            "name": signal_config_obj.name,
-            "signal_key": signal_config_obj.signal_key,
-            "description": signal_config_obj.description,
-            "symbol_hint": signal_config_obj.symbol_hint,
-            "timeframe_hint": signal_config_obj.timeframe_hint,
-            "enabled": signal_config_obj.enabled,
-            "created_at": signal_config_obj.created_at,
-            "updated_at": signal_config_obj.updated_at,
-        }
-        bot_out.signal = TVSignalConfigOut(**signal_dict)
+    # 構建回應，包含 signal 資訊；資料直接來自資料庫欄位，直接序列化回傳，不經過 response_model 驗證
+    return FastJSONResponse(content=_bot_out_dict(bot, signal_config_obj))
+
+
+def _set_bot_enabled(db: Session, bot_id: int, enabled: bool) -> str:
+    """
+    以單一 UPDATE ... RETURNING 切換 Bot 的 enabled 狀態（不先 SELECT 載入 Bot 物件）
+    
+    Returns:
+        str: Bot 名稱（用於日誌）
     
-    return bot_out
+    Raises:
+        HTTPException: 當 Bot 不存在時
+    """
+    bot_name = db.execute(
+        update(BotConfig)
+        .where(BotConfig.id == bot_id)
+        .values(enabled=enabled, updated_at=datetime.now(timezone.utc))
+        .returning(BotConfig.name)
+        .execution_options(synchronize_session=False)
+    ).scalar_one_or_none()
+    if bot_name is None:
+        db.rollback()
+        raise HTTPException(status_code=404, detail=f"Bot {bot_id} 不存在")
+    db.commit()
+    return bot_name
 
 
 @app.post("/bots/{bot_id}/enable")
@@ -4784,17 +4979,11 @@ async def enable_bot(
     Raises:
         HTTPException: 當 Bot 不存在時
     """
-    bot = db.query(BotConfig).filter(BotConfig.id == bot_id).first()
-    if not bot:
-        raise HTTPException(status_code=404, detail=f"Bot {bot_id} 不存在")
+    bot_name = _set_bot_enabled(db, bot_id, True)
     
-    bot.enabled = True
-    bot.updated_at = datetime.now(timezone.utc)
-    db.commit()
-    
-    logger.info(f"啟用 Bot: {bot.id} ({bot.name})")
+    logger.info(f"啟用 Bot: {bot_id} ({bot_name})")
     
-    return {"status": "enabled", "bot_id": bot.id}
+    return {"status": "enabled", "bot_id": bot_id}
 
 
 @app.post("/bots/{bot_id}/disable")
@@ -4819,17 +5008,11 @@ async def disable_bot(
     Raises:
         HTTPException: 當 Bot 不存在時
     """
-    bot = db.query(BotConfig).filter(BotConfig.id == bot_id).first()
-    if not bot:
-        raise HTTPException(status_code=404, detail=f"Bot {bot_id} 不存在")
+    bot_name = _set_bot_enabled(db, bot_id, False)
     
-    bot.enabled = False
-    bot.updated_at = datetime.now(timezone.utc)
-    db.commit()
-    
-    logger.info(f"停用 Bot: {bot.id} ({bot.name})")
+    logger.info(f"停用 Bot: {bot_id} ({bot_name})")
     
-    return {"status": "disabled", "bot_id": bot.id}
+    return {"status": "disabled", "bot_id": bot_id}
 
 
 @app.delete("/bots/{bot_id}")
@@ -4856,17 +5039,21 @@ async def delete_bot(
     Raises:
         HTTPException: 當 Bot 不存在時
     """
-    bot = db.query(BotConfig).filter(BotConfig.id == bot_id).first()
+    bot = db.get(BotConfig, bot_id)
     if not bot:
         raise HTTPException(status_code=404, detail=f"Bot {bot_id} 不存在")
     
     # 檢查是否有關聯的 OPEN 倉位
-    open_positions_count = db.query(Position).filter(
+    # 只需要知道是否存在 OPEN 倉位：EXISTS 找到第一筆即停止，不需要 COUNT 全部
+    open_positions_filter = db.query(Position).filter(
         Position.bot_id == bot_id,
         Position.status == "OPEN"
-    ).count()
+    )
+    has_open_positions = db.query(open_positions_filter.exists()).scalar()
     
-    if open_positions_count > 0:
+    if has_open_positions:
+        # 錯誤訊息需要數量，僅在這個少見的路徑才計算
+        open_positions_count = open_positions_filter.count()
         raise HTTPException(
             status_code=400,
             detail=f"無法刪除 Bot {bot_id}：仍有 {open_positions_count} 個 OPEN 倉位關聯到此 Bot。請先關閉倉位再刪除 Bot。"
@@ -4935,7 +5122,7 @@ class PositionStopConfigUpdate(BaseModel):
     clear_overrides: bool = Field(False, description="如果為 true，清除所有覆寫值（設為 null）")
 
 
-@app.patch("/positions/{pos_id}/stop-config", response_model=PositionOut)
+@app.patch("/positions/{pos_id}/stop-config", response_model=PositionOut, response_class=FastJSONResponse)
 async def update_position_stop_config(
     pos_id: int,
     update: PositionStopConfigUpdate,
@@ -4964,52 +5151,69 @@ async def update_position_stop_config(
     Raises:
         HTTPException: 當倉位不存在時
     """
-    position = db.query(Position).filter(Position.id == pos_id).first()
-    if not position:
-        raise HTTPException(status_code=404, detail="Position not found")
-    
+    # 覆寫值只取決於請求內容，先算出要寫入的欄位，再以單一 UPDATE ... RETURNING
+    # 同時完成「存在檢查 + 寫入 + 讀回」，不需要先 SELECT 再 refresh
+    fields = {}
     if update.clear_overrides:
-        position.dyn_profit_threshold_pct = None
-        position.base_stop_loss_pct = None
+        fields["dyn_profit_threshold_pct"] = None
+        fields["base_stop_loss_pct"] = None
         # trail_callback 保留原值，除非明確指定
         if update.trail_callback is not None:
-            position.trail_callback = update.trail_callback
+            fields["trail_callback"] = update.trail_callback
     else:
         if update.dyn_profit_threshold_pct is not None:
             if update.dyn_profit_threshold_pct < 0:
                 logger.warning(
-                    f"倉位 {position.id} dyn_profit_threshold_pct < 0 ({update.dyn_profit_threshold_pct})，已設為 0"
+                    f"倉位 {pos_id} dyn_profit_threshold_pct < 0 ({update.dyn_profit_threshold_pct})，已設為 0"
                 )
-                position.dyn_profit_threshold_pct = 0.0
+                fields["dyn_profit_threshold_pct"] = 0.0
             else:
-                position.dyn_profit_threshold_pct = update.dyn_profit_threshold_pct
+                fields["dyn_profit_threshold_pct"] = update.dyn_profit_threshold_pct
         
         if update.base_stop_loss_pct is not None:
             if update.base_stop_loss_pct < 0:
                 logger.warning(
-                    f"倉位 {position.id} base_stop_loss_pct < 0 ({update.base_stop_loss_pct})，已設為 0"
+                    f"倉位 {pos_id} base_stop_loss_pct < 0 ({update.base_stop_loss_pct})，已設為 0"
                 )
-                position.base_stop_loss_pct = 0.0
+                fields["base_stop_loss_pct"] = 0.0
             else:
-                position.base_stop_loss_pct = update.base_stop_loss_pct
+                fields["base_stop_loss_pct"] = update.base_stop_loss_pct
         
         if update.trail_callback is not None:
             # clamp to [0, 1] and handle 0 meaning "base stop only"
             val = update.trail_callback
             if val < 0:
                 logger.warning(
-                    f"倉位 {position.id} trail_callback < 0 ({val})，已設為 0 (base-stop only)"
+                    f"倉位 {pos_id} trail_callback < 0 ({val})，已設為 0 (base-stop only)"
                 )
                 val = 0.0
             elif val > 1:
                 logger.warning(
-                    f"倉位 {position.id} trail_callback > 1 ({val})，已調整為 1.0"
+                    f"倉位 {pos_id} trail_callback > 1 ({val})，已調整為 1.0"
                 )
                 val = 1.0
-            position.trail_callback = val
-    
-    db.commit()
-    db.refresh(position)
+            fields["trail_callback"] = val
+    
+    if fields:
+        # 參數名 update 遮蔽了 sqlalchemy.update，這裡改用 Table.update()
+        row = db.execute(
+            Position.__table__.update()
+            .where(Position.id == pos_id)
+            .values(**fields)
+            .returning(*Position.__table__.columns)
+        ).first()
+        if row is None:
+            raise HTTPException(status_code=404, detail="Position not found")
+        db.commit()
+        # SQLite 的 RETURNING 回傳的是套用 REAL 欄位型別之前的值（2.0 可能回傳為整數 2），
+        # 直接以 PositionOut 驗證 RETURNING 的欄位，轉成與 GET /positions 相同的型別
+        position = PositionOut(**row._mapping)
+    else:
+        # 沒有任何欄位要更新：只需讀取一次
+        db_position = db.get(Position, pos_id)
+        if not db_position:
+            raise HTTPException(status_code=404, detail="Position not found")
+        position = _model_from_orm(PositionOut, db_position)
     
     logger.info(
         f"倉位 {position.id} ({position.symbol}) 停損配置已更新："
@@ -5018,60 +5222,20 @@ async def update_position_stop_config(
         f"trail_callback={position.trail_callback}"
     )
     
-    # 計算實際使用的值和來源標記（與 get_positions 中的邏輯一致）
-    pos_dict = position.to_dict()
-    
-    # Profit Threshold
-    profit_threshold_value = None
-    profit_threshold_source = None
-    if position.dyn_profit_threshold_pct is not None:
-        profit_threshold_value = position.dyn_profit_threshold_pct
-        profit_threshold_source = "override"
-    elif TRAILING_CONFIG.profit_threshold_pct is not None:
-        profit_threshold_value = TRAILING_CONFIG.profit_threshold_pct
-        profit_threshold_source = "global"
-    else:
-        profit_threshold_value = DYN_PROFIT_THRESHOLD_PCT
-        profit_threshold_source = "default"
-    
-    # Lock Ratio
-    lock_ratio_value = None
-    lock_ratio_source = None
-    if position.trail_callback is not None:
-        lock_ratio_value = position.trail_callback
-        lock_ratio_source = "override"
-    elif TRAILING_CONFIG.lock_ratio is not None:
-        lock_ratio_value = TRAILING_CONFIG.lock_ratio
-        lock_ratio_source = "global"
-    else:
-        lock_ratio_value = DYN_LOCK_RATIO_DEFAULT
-        lock_ratio_source = "default"
-    
-    # Base SL%
-    base_sl_value = None
-    base_sl_source = None
-    if position.base_stop_loss_pct is not None:
-        base_sl_value = position.base_stop_loss_pct
-        base_sl_source = "override"
-    elif TRAILING_CONFIG.base_sl_pct is not None:
-        base_sl_value = TRAILING_CONFIG.base_sl_pct
-        base_sl_source = "global"
-    else:
-        base_sl_value = DYN_BASE_SL_PCT
-        base_sl_source = "default"
+    # 回應只包含 PositionOut 的欄位（與 response_model 宣告的格式一致，不含 bot_id 等內部欄位）
+    pos_dict = _model_dump(position)
     
-    # 添加額外字段
+    # 計算實際使用的值和來源標記（與 get_positions 中的邏輯一致）
+    pos_dict.update(resolve_stop_config_fields(
+        position.dyn_profit_threshold_pct, position.trail_callback, position.base_stop_loss_pct
+    ))
     pos_dict.update({
-        "profit_threshold_value": profit_threshold_value,
-        "profit_threshold_source": profit_threshold_source,
-        "lock_ratio_value": lock_ratio_value,
-        "lock_ratio_source": lock_ratio_source,
-        "base_sl_value": base_sl_value,
-        "base_sl_source": base_sl_source,
+        "stop_mode": None,
+        "base_stop_price": None,
+        "dynamic_stop_price": None,
     })
     
-    # 使用 from_orm 或 model_validate 返回 PositionOut
-    return PositionOut(**pos_dict)
+    return FastJSONResponse(content=pos_dict)
 
 
 class BinancePositionStopConfigUpdate(BaseModel):
@@ -5087,7 +5251,8 @@ class BinancePositionStopConfigUpdate(BaseModel):
 @app.patch("/binance/positions/stop-config", response_model=dict)
 async def update_binance_position_stop_config(
     update: BinancePositionStopConfigUpdate,
-    user: dict = Depends(require_admin_user)
+    user: dict = Depends(require_admin_user),
+    db: Session = Depends(get_db)
 ):
     """
     更新 Binance Live Position 的停損配置覆寫值
@@ -5098,6 +5263,7 @@ async def update_binance_position_stop_config(
     Args:
         update: 更新請求（包含 symbol, position_side 和覆寫值）
         user: 管理員使用者資訊
+        db: 資料庫 Session
     
     Returns:
         dict: 更新結果
@@ -5108,71 +5274,79 @@ async def update_binance_position_stop_config(
     if update.position_side.upper() not in ["LONG", "SHORT"]:
         raise HTTPException(status_code=400, detail="position_side 必須是 LONG 或 SHORT")
     
-    override_key = f"{update.symbol.upper()}|{update.position_side.upper()}"
+    symbol_upper = update.symbol.upper()
+    side_upper = update.position_side.upper()
+    override_key = (symbol_upper, side_upper)
     
     if update.clear_overrides:
         # 清除覆寫值
-        if override_key in _binance_position_stop_overrides:
-            del _binance_position_stop_overrides[override_key]
-        logger.info(f"已清除 Binance Live Position {override_key} 的停損配置覆寫")
+        _binance_position_stop_overrides.pop(override_key, None)
+        logger.info(f"已清除 Binance Live Position {symbol_upper}|{side_upper} 的停損配置覆寫")
     else:
         # 更新覆寫值
-        overrides = _binance_position_stop_overrides.get(override_key, {})
+        overrides = _binance_position_stop_overrides.get(override_key)
+        if overrides is None:
+            overrides = _StopOverride()
         
         if update.dyn_profit_threshold_pct is not None:
             if update.dyn_profit_threshold_pct < 0:
                 logger.warning(
-                    f"Binance Live Position {override_key} dyn_profit_threshold_pct < 0 ({update.dyn_profit_threshold_pct})，已設為 0"
+                    f"Binance Live Position {symbol_upper}|{side_upper} dyn_profit_threshold_pct < 0 ({update.dyn_profit_threshold_pct})，已設為 0"
                 )
-                overrides["dyn_profit_threshold_pct"] = 0.0
+                overrides.dyn_profit_threshold_pct = 0.0
             else:
-                overrides["dyn_profit_threshold_pct"] = update.dyn_profit_threshold_pct
+                overrides.dyn_profit_threshold_pct = update.dyn_profit_threshold_pct
         
         if update.base_stop_loss_pct is not None:
             if update.base_stop_loss_pct < 0:
                 logger.warning(
-                    f"Binance Live Position {override_key} base_stop_loss_pct < 0 ({update.base_stop_loss_pct})，已設為 0"
+                    f"Binance Live Position {symbol_upper}|{side_upper} base_stop_loss_pct < 0 ({update.base_stop_loss_pct})，已設為 0"
                 )
-                overrides["base_stop_loss_pct"] = 0.0
+                overrides.base_stop_loss_pct = 0.0
             else:
-                overrides["base_stop_loss_pct"] = update.base_stop_loss_pct
+                overrides.base_stop_loss_pct = update.base_stop_loss_pct
         
         if update.trail_callback is not None:
             # clamp to [0, 1] and handle 0 meaning "base stop only"
             val = update.trail_callback
             if val < 0:
                 logger.warning(
-                    f"Binance Live Position {override_key} trail_callback < 0 ({val})，已設為 0 (base-stop only)"
+                    f"Binance Live Position {symbol_upper}|{side_upper} trail_callback < 0 ({val})，已設為 0 (base-stop only)"
                 )
                 val = 0.0
             elif val > 1:
                 logger.warning(
-                    f"Binance Live Position {override_key} trail_callback > 1 ({val})，已調整為 1.0"
+                    f"Binance Live Position {symbol_upper}|{side_upper} trail_callback > 1 ({val})，已調整為 1.0"
                 )
                 val = 1.0
-            overrides["trail_callback"] = val
+            overrides.trail_callback = val
         
         _binance_position_stop_overrides[override_key] = overrides
         
         logger.info(
-            f"Binance Live Position {override_key} 停損配置已更新："
-            f"dyn_profit_threshold_pct={overrides.get('dyn_profit_threshold_pct')}, "
-            f"base_stop_loss_pct={overrides.get('base_stop_loss_pct')}, "
-            f"trail_callback={overrides.get('trail_callback')}"
+            f"Binance Live Position {symbol_upper}|{side_upper} 停損配置已更新："
+            f"dyn_profit_threshold_pct={overrides.dyn_profit_threshold_pct}, "
+            f"base_stop_loss_pct={overrides.base_stop_loss_pct}, "
+            f"trail_callback={overrides.trail_callback}"
         )
     
     # 計算實際使用的值和來源標記（與 get_binance_open_positions 中的邏輯一致）
-    overrides = _binance_position_stop_overrides.get(override_key, {})
+    overrides = _binance_position_stop_overrides.get(override_key, _NO_STOP_OVERRIDE)
     
     # 查找對應的本地 Position（如果存在）
-    from models import Position
-    db = next(get_db())
     try:
+        # 只需要停損相關的三個欄位
         local_pos = (
             db.query(Position)
+            .options(load_only(
+                Position.id,
+                Position.dyn_profit_threshold_pct,
+                Position.trail_callback,
+                Position.base_stop_loss_pct,
+            ))
             .filter(
-                Position.symbol == update.symbol.upper(),
-                Position.side == update.position_side.upper(),
+                Position.symbol == symbol_upper,
+                Position.side == side_upper,
                 Position.status == "OPEN",
             )
             .order_by(Position.id.desc())
@@ -5180,69 +5354,19 @@ async def update_binance_position_stop_config(
         )
     except Exception:
         local_pos = None
-    finally:
-        db.close()
-    
-    # Profit Threshold
-    profit_threshold_value = None
-    profit_threshold_source = None
-    if overrides.get("dyn_profit_threshold_pct") is not None:
-        profit_threshold_value = overrides["dyn_profit_threshold_pct"]
-        profit_threshold_source = "override"
-    elif local_pos and local_pos.dyn_profit_threshold_pct is not None:
-        profit_threshold_value = local_pos.dyn_profit_threshold_pct
-        profit_threshold_source = "override"
-    elif TRAILING_CONFIG.profit_threshold_pct is not None:
-        profit_threshold_value = TRAILING_CONFIG.profit_threshold_pct
-        profit_threshold_source = "global"
-    else:
-        profit_threshold_value = DYN_PROFIT_THRESHOLD_PCT
-        profit_threshold_source = "default"
-    
-    # Lock Ratio
-    lock_ratio_value = None
-    lock_ratio_source = None
-    if overrides.get("trail_callback") is not None:
-        lock_ratio_value = overrides["trail_callback"]
-        lock_ratio_source = "override"
-    elif local_pos and local_pos.trail_callback is not None:
-        lock_ratio_value = local_pos.trail_callback
-        lock_ratio_source = "override"
-    elif TRAILING_CONFIG.lock_ratio is not None:
-        lock_ratio_value = TRAILING_CONFIG.lock_ratio
-        lock_ratio_source = "global"
-    else:
-        lock_ratio_value = DYN_LOCK_RATIO_DEFAULT
-        lock_ratio_source = "default"
-    
-    # Base SL%
-    base_sl_value = None
-    base_sl_source = None
-    if overrides.get("base_stop_loss_pct") is not None:
-        base_sl_value = overrides["base_stop_loss_pct"]
-        base_sl_source = "override"
-    elif local_pos and local_pos.base_stop_loss_pct is not None:
-        base_sl_value = local_pos.base_stop_loss_pct
-        base_sl_source = "override"
-    elif TRAILING_CONFIG.base_sl_pct is not None:
-        base_sl_value = TRAILING_CONFIG.base_sl_pct
-        base_sl_source = "global"
-    else:
-        base_sl_value = DYN_BASE_SL_PCT
-        base_sl_source = "default"
     
     return {
         "success": True,
         "symbol": update.symbol.upper(),
         "position_side": update.position_side.upper(),
-        "overrides": overrides,
+        "overrides": overrides.to_dict(),
         # 添加實際使用的值和來源標記（用於前端顯示和顏色標記）
-        "profit_threshold_value": profit_threshold_value,
-        "profit_threshold_source": profit_threshold_source,
-        "lock_ratio_value": lock_ratio_value,
-        "lock_ratio_source": lock_ratio_source,
-        "base_sl_value": base_sl_value,
-        "base_sl_source": base_sl_source,
+        **resolve_stop_config_fields(
+            overrides.dyn_profit_threshold_pct,
+            overrides.trail_callback,
+            overrides.base_stop_loss_pct,
+            local_pos,
+        ),
     }
 
 
@@ -5258,7 +5382,7 @@ async def delete_position_record(
     注意：此操作僅會刪除本地資料庫中的倉位記錄，不會對 Binance 上的實際倉位進行任何操作。
     如果倉位仍為 OPEN 狀態，請務必確認實際倉位已關閉，否則刪除紀錄後將無法自動追蹤該倉位。
     """
-    position = db.query(Position).filter(Position.id == pos_id).first()
+    position = db.get(Position, pos_id)
     if not position:
         raise HTTPException(status_code=404, detail="Position not found")
     
@@ -5300,7 +5424,7 @@ async def close_position(
         dict: 關倉結果
     """
     # 從資料庫取出 Position
-    position = db.query(Position).filter(Position.id == pos_id).first()
+    position = db.get(Position, pos_id)
     
     if not position:
         raise HTTPException(status_code=404, detail="找不到指定的倉位記錄")
@@ -5372,7 +5496,7 @@ async def update_trailing(
         PositionOut: 更新後的倉位資訊
     """
     # 從資料庫取出 Position
-    position = db.query(Position).filter(Position.id == pos_id).first()
+    position = db.get(Position, pos_id)
     
     if not position:
         raise HTTPException(status_code=404, detail="找不到指定的倉位記錄")
@@ -5395,6 +5519,11 @@ async def update_trailing(
                 detail="trailing_callback_percent 必須在 0~100 之間"
             )
         
+        # 如果 highest_price 為空，需要目前的標記價格初始化；在修改倉位之前先取得，
+        # 並放到執行緒中執行，網路請求期間不佔住 event loop
+        need_mark_price = position.highest_price is None
+        mark_price = await asyncio.to_thread(get_mark_price, position.symbol) if need_mark_price else None
+        
         if pct == 0:
             logger.info(
                 f"倉位 {position.id} ({position.symbol}) 更新 trailing_callback_percent=0，僅使用 base stop-loss"
@@ -5408,14 +5537,13 @@ async def update_trailing(
             )
         
         # 如果 highest_price 為空，初始化為目前的標記價格
-        if position.highest_price is None:
-            mark_price = get_mark_price(position.symbol)
+        if need_mark_price:
             position.highest_price = mark_price
         
         db.commit()
-        db.refresh(position)
         
-        return PositionOut(**position.to_dict())
+        # 直接從 ORM 物件驗證，不經過 to_dict() 的中間 dict 與 isoformat 字串轉換
+        return _model_from_orm(PositionOut, position)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"更新追蹤停損設定失敗: {str(e)}")
@@ -5449,9 +5577,47 @@ async def health_check():
 
 # ==================== Admin Prune Endpoints ====================
 
+def _prune_signal_logs(db: Session, days: int) -> tuple:
+    """
+    刪除 received_at 早於 days 天前的 signal logs
+    
+    Returns:
+        tuple: (刪除筆數, 截止時間)
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    stmt = (
+        delete(TradingViewSignalLog)
+        .where(TradingViewSignalLog.received_at < cutoff)
+        .execution_options(synchronize_session=False)
+    )
+    result = db.execute(stmt)
+    db.commit()
+    
+    deleted_count = getattr(result, "rowcount", None)
+    logger.info(f"Prune signal logs: 刪除 {deleted_count} 筆（保留最近 {days} 天，截止時間: {cutoff.isoformat()}）")
+    return deleted_count, cutoff
+
+
+def _run_prune_in_background(prune_func, **kwargs):
+    """
+    以 BackgroundTasks 執行清理函式（在回應送出後），使用獨立的 DB Session；
+    失敗時只記錄錯誤。
+    """
+    db = SessionLocal()
+    try:
+        prune_func(db, **kwargs)
+    except Exception as e:
+        logger.error(f"背景清理 {prune_func.__name__} 失敗: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
 @app.delete("/admin/signal-logs/prune")
 def prune_signal_logs(
+    background_tasks: BackgroundTasks,
     days: int = Query(30, ge=1, le=365, description="保留最近幾天的 signal logs"),
+    background: bool = Query(False, description="是否在背景執行刪除（立即回傳 202，不等待刪除完成）"),
     db: Session = Depends(get_db),
     user: dict = Depends(require_admin_user),
 ):
@@ -5459,22 +5625,23 @@ def prune_signal_logs(
     清理舊的 TradingView Signal Logs
     
     僅限已登入的管理員使用。
+    background=true 時，刪除改在回應送出後於背景執行，立即回傳 202（不含刪除筆數）。
     
     Args:
+        background_tasks: FastAPI 背景任務
         days: 保留最近幾天的 logs（預設 30 天）
+        background: 是否在背景執行刪除
         db: 資料庫 Session
         user: 管理員使用者資訊（由 Depends(require_admin_user) 自動驗證）
     
     Returns:
         dict: 清理結果，包含刪除的筆數和截止時間
     """
-    cutoff = datetime.utcnow() - timedelta(days=days)
-    stmt = delete(TradingViewSignalLog).where(TradingViewSignalLog.received_at < cutoff)
-    result = db.execute(stmt)
-    db.commit()
+    if background:
+        background_tasks.add_task(_run_prune_in_background, _prune_signal_logs, days=days)
+        return JSONResponse(status_code=202, content={"success": True, "accepted": True, "days": days})
     
-    deleted_count = getattr(result, "rowcount", None)
-    logger.info(f"Prune signal logs: 刪除 {deleted_count} 筆（保留最近 {days} 天，截止時間: {cutoff.isoformat()}）")
+    deleted_count, cutoff = _prune_signal_logs(db, days)
     
     return {
         "success": True,
@@ -5502,15 +5669,12 @@ def clear_all_signal_logs(
     Returns:
         dict: 清理結果，包含刪除的筆數
     """
-    # 先計算總數
-    total_count = db.query(TradingViewSignalLog).count()
-    
-    # 刪除所有記錄
-    stmt = delete(TradingViewSignalLog)
+    # 刪除所有記錄；刪除筆數直接取 rowcount，不另外先 COUNT(*)
+    stmt = delete(TradingViewSignalLog).execution_options(synchronize_session=False)
     result = db.execute(stmt)
     db.commit()
     
-    deleted_count = getattr(result, "rowcount", None) or total_count
+    deleted_count = result.rowcount
     logger.info(f"Clear all signal logs: 刪除 {deleted_count} 筆")
     
     return {
@@ -5520,28 +5684,14 @@ def clear_all_signal_logs(
     }
 
 
-@app.delete("/admin/positions/prune-closed")
-def prune_closed_positions(
-    days: int = Query(30, ge=1, le=365, description="保留最近幾天內關閉的倉位"),
-    include_error: bool = Query(False, description="是否同時刪除 ERROR 狀態的倉位"),
-    db: Session = Depends(get_db),
-    user: dict = Depends(require_admin_user),
-):
+def _prune_closed_positions(db: Session, days: int, include_error: bool) -> tuple:
     """
-    清理舊的已關閉倉位記錄
-    
-    僅限已登入的管理員使用。
-    
-    Args:
-        days: 保留最近幾天內關閉的倉位（預設 30 天）
-        include_error: 是否同時刪除 ERROR 狀態的倉位（預設 False）
-        db: 資料庫 Session
-        user: 管理員使用者資訊（由 Depends(require_admin_user) 自動驗證）
+    刪除 closed_at 早於 days 天前的 CLOSED 倉位（include_error=True 時同時刪除所有 ERROR 倉位）
     
     Returns:
-        dict: 清理結果，包含刪除的筆數和截止時間
+        tuple: (刪除筆數, 截止時間)
     """
-    cutoff = datetime.utcnow() - timedelta(days=days)
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
     
     # 建立刪除條件
     if include_error:
@@ -5567,12 +5717,52 @@ def prune_closed_positions(
                 Position.closed_at < cutoff
             )
         )
-    result = db.execute(stmt)
+    # 批次刪除不需要同步 session 中已載入的物件
+    result = db.execute(stmt.execution_options(synchronize_session=False))
     db.commit()
     
     deleted_count = getattr(result, "rowcount", None)
     error_info = "（包含 ERROR 狀態）" if include_error else ""
     logger.info(f"Prune closed positions: 刪除 {deleted_count} 筆{error_info}（保留最近 {days} 天內關閉的倉位，截止時間: {cutoff.isoformat()}）")
+    return deleted_count, cutoff
+
+
+@app.delete("/admin/positions/prune-closed")
+def prune_closed_positions(
+    background_tasks: BackgroundTasks,
+    days: int = Query(30, ge=1, le=365, description="保留最近幾天內關閉的倉位"),
+    include_error: bool = Query(False, description="是否同時刪除 ERROR 狀態的倉位"),
+    background: bool = Query(False, description="是否在背景執行刪除（立即回傳 202，不等待刪除完成）"),
+    db: Session = Depends(get_db),
+    user: dict = Depends(require_admin_user),
+):
+    """
+    清理舊的已關閉倉位記錄
+    
+    僅限已登入的管理員使用。
+    background=true 時，刪除改在回應送出後於背景執行，立即回傳 202（不含刪除筆數）。
+    
+    Args:
+        background_tasks: FastAPI 背景任務
+        days: 保留最近幾天內關閉的倉位（預設 30 天）
+        include_error: 是否同時刪除 ERROR 狀態的倉位（預設 False）
+        background: 是否在背景執行刪除
+        db: 資料庫 Session
+        user: 管理員使用者資訊（由 Depends(require_admin_user) 自動驗證）
+    
+    Returns:
+        dict: 清理結果，包含刪除的筆數和截止時間
+    """
+    if background:
+        background_tasks.add_task(
+            _run_prune_in_background, _prune_closed_positions, days=days, include_error=include_error
+        )
+        return JSONResponse(
+            status_code=202,
+            content={"success": True, "accepted": True, "days": days, "include_error": include_error},
+        )
+    
+    deleted_count, cutoff = _prune_closed_positions(db, days, include_error)
     
     return {
         "success": True,
@@ -5601,15 +5791,12 @@ def clear_error_positions(
     Returns:
         dict: 清理結果，包含刪除的筆數
     """
-    # 先計算 ERROR 狀態的總數
-    error_count = db.query(Position).filter(Position.status == "ERROR").count()
-    
-    # 刪除所有 ERROR 狀態的記錄
-    stmt = delete(Position).where(Position.status == "ERROR")
+    # 刪除所有 ERROR 狀態的記錄；刪除筆數直接取 rowcount，不另外先 COUNT(*)
+    stmt = delete(Position).where(Position.status == "ERROR").execution_options(synchronize_session=False)
     result = db.execute(stmt)
     db.commit()
     
-    deleted_count = getattr(result, "rowcount", None) or error_count
+    deleted_count = result.rowcount
     logger.info(f"Clear error positions: 刪除 {deleted_count} 筆 ERROR 狀態的倉位")
     
     return {
@@ -5624,12 +5811,12 @@ def clear_error_positions(
 if __name__ == "__main__":
     import uvicorn
     
-    # 開發模式下啟動伺服器
-    # 預設監聽 0.0.0.0:8000
-    # 正式環境建議使用生產級 ASGI 伺服器（如 gunicorn + uvicorn workers）
+    # 啟動伺服器，預設監聽 0.0.0.0:8000
+    # UVICORN_RELOAD=1 時啟用開發模式（程式碼變更時自動重載，會多一個監看檔案的子行程）
+    # 注意：追蹤停損背景任務在每個 worker 行程各跑一份，請維持單一 worker
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True  # 開發模式：程式碼變更時自動重載
+        reload=os.getenv("UVICORN_RELOAD", "0") == "1",
     )
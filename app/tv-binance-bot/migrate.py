@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+資料庫遷移腳本：一次套用所有既有資料庫需要的欄位與索引
+
+合併以下遷移腳本的內容，在單一 transaction 中執行（全部成功或全部不套用）：
+- migrate_add_max_invest_usdt.py：bot_configs.max_invest_usdt
+- migrate_add_position_size.py：tv_signal_logs.position_size
+- migrate_add_position_indexes.py：positions / tv_signal_logs 索引
+
+每張表只執行一次 PRAGMA table_info 檢查既有欄位、一次 sqlite_master 查詢檢查既有索引，已存在的會略過。
+新建立的資料庫會由 init_db() 自動建立這些欄位和索引，此腳本用於既有的資料庫。
+
+執行方式：
+    python migrate.py
+"""
+
+import sqlite3
+import os
+
+from migrate_add_position_indexes import INDEXES
+
+DB_FILE = "trading_bot.db"
+
+# (資料表, 欄位名稱, 欄位定義)
+COLUMNS = [
+    ("bot_configs", "max_invest_usdt", "REAL NULL"),
+    ("tv_signal_logs", "position_size", "REAL NULL"),
+]
+
+def _existing_columns(cursor, table):
+    """回傳資料表既有欄位名稱的 set（一次 PRAGMA table_info，之後以 O(1) 查詢）"""
+    cursor.execute(f"PRAGMA table_info({table})")
+    return {row[1] for row in cursor}
+
+def migrate():
+    """執行遷移：添加缺少的欄位和索引"""
+    if not os.path.exists(DB_FILE):
+        print(f"錯誤：找不到資料庫檔案 {DB_FILE}")
+        return False
+    
+    # isolation_level=None：由腳本自行控制 BEGIN / COMMIT，讓 ALTER TABLE 與 CREATE INDEX 在同一個 transaction 中
+    conn = sqlite3.connect(DB_FILE, isolation_level=None)
+    cursor = conn.cursor()
+    
+    try:
+        # 檢查欄位和索引是否已存在（每張表只查一次）；全部已存在時不開 transaction 直接返回
+        existing_columns = {
+            table: _existing_columns(cursor, table)
+            for table in {table for table, _, _ in COLUMNS}
+        }
+        
+        # 所有索引名稱由 sqlite_master 一次查出，不必對每張表各跑一次 PRAGMA index_list
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+        existing_indexes = {row[0] for row in cursor}
+        
+        statements = []
+        for table, column, ddl in COLUMNS:
+            if column in existing_columns[table]:
+                print(f"✓ {table}.{column} 欄位已存在，無需遷移")
+            else:
+                statements.append((f"添加 {table}.{column} 欄位", f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+        
+        for index_name, table, columns in INDEXES:
+            if index_name in existing_indexes:
+                print(f"✓ {index_name} 索引已存在，無需遷移")
+            else:
+                statements.append((f"添加 {index_name} 索引", f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({columns})"))
+        
+        if not statements:
+            return True
+        
+        cursor.execute("BEGIN")
+        for description, sql in statements:
+            print(f"開始遷移：{description}...")
+            cursor.execute(sql)
+        cursor.execute("COMMIT")
+        
+        for description, _ in statements:
+            print(f"✓ 成功{description}")
+        return True
+    
+    except Exception as e:
+        print(f"❌ 遷移失敗: {e}")
+        import traceback
+        traceback.print_exc()
+        if conn.in_transaction:
+            cursor.execute("ROLLBACK")
+        return False
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("資料庫遷移：添加缺少的欄位和索引")
+    print("=" * 60)
+
+    if migrate():
+        print("\n✓ 遷移完成！")
+    else:
+        print("\n❌ 遷移失敗，請檢查錯誤訊息")
+        exit(1)
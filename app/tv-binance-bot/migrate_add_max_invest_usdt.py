@@ -9,7 +9,6 @@
 
 import sqlite3
 import os
-from pathlib import Path
 
 DB_FILE = "trading_bot.db"
 
@@ -25,7 +24,7 @@ def migrate():
     try:
         # 檢查欄位是否已存在
         cursor.execute("PRAGMA table_info(bot_configs)")
-        columns = [row[1] for row in cursor.fetchall()]
+        columns = {row[1] for row in cursor}
         
         if "max_invest_usdt" in columns:
             print("✓ max_invest_usdt 欄位已存在，無需遷移")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+資料庫遷移腳本：為 positions 表添加複合索引，並為 tv_signal_logs 添加時間索引
+
+- ix_positions_symbol_side_status (symbol, side, status)：以 Binance 倉位查找對應的本地 OPEN Position
+- ix_positions_status_closed_at (status, closed_at)：統計 / 匯出已平倉倉位的日期區間查詢
+- ix_positions_bot_id_status (bot_id, status)：刪除 Bot 前檢查是否仍有 OPEN 倉位
+- ix_tv_signal_logs_received_at (received_at)：清理舊 signal logs 的日期區間刪除
+
+新建立的資料庫會由 init_db() 自動建立這些索引，此腳本用於既有的資料庫。
+
+執行方式：
+    python migrate_add_position_indexes.py
+"""
+
+import sqlite3
+import os
+
+DB_FILE = "trading_bot.db"
+
+# (索引名稱, 資料表, 欄位)
+INDEXES = [
+    ("ix_positions_symbol_side_status", "positions", "symbol, side, status"),
+    ("ix_positions_status_closed_at", "positions", "status, closed_at"),
+    ("ix_positions_bot_id_status", "positions", "bot_id, status"),
+    ("ix_tv_signal_logs_received_at", "tv_signal_logs", "received_at"),
+]
+
+def migrate():
+    """執行遷移：添加 positions 複合索引"""
+    if not os.path.exists(DB_FILE):
+        print(f"錯誤：找不到資料庫檔案 {DB_FILE}")
+        return False
+    
+    conn = sqlite3.connect(DB_FILE)
+    cursor = conn.cursor()
+    
+    try:
+        # 檢查索引是否已存在
+        existing_indexes = set()
+        for table in {table for _, table, _ in INDEXES}:
+            cursor.execute(f"PRAGMA index_list({table})")
+            existing_indexes.update(row[1] for row in cursor)
+        
+        for index_name, table, columns in INDEXES:
+            if index_name in existing_indexes:
+                print(f"✓ {index_name} 索引已存在，無需遷移")
+                continue
+            
+            print(f"開始遷移：添加 {index_name} 索引...")
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({columns})")
+            print(f"✓ 成功添加 {index_name} 索引")
+        
+        conn.commit()
+        return True
+                
+    except Exception as e:
+        print(f"❌ 遷移失敗: {e}")
+        import traceback
+        traceback.print_exc()
+        conn.rollback()
+        return False
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("資料庫遷移：添加 positions / tv_signal_logs 索引")
+    print("=" * 60)
+    
+    if migrate():
+        print("\n✓ 遷移完成！")
+    else:
+        print("\n❌ 遷移失敗，請檢查錯誤訊息")
+        exit(1)
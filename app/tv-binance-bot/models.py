@@ -5,13 +5,67 @@
 目前包含 Position 模型，用於記錄交易倉位資訊。
 """
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, JSON, ForeignKey, Text
+from operator import attrgetter
+
+from sqlalchemy import BigInteger, Column, Integer, String, Float, DateTime, Boolean, JSON, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from db import Base
 
+# 只增不減的大表主鍵使用 BIGINT；SQLite 只有宣告為 INTEGER PRIMARY KEY 的欄位才會自動遞增（本身即為 64-bit rowid），
+# 因此在 SQLite 上仍建立為 INTEGER
+_BigIntPK = BigInteger().with_variant(Integer, "sqlite")
+
+
+class _DictMixin:
+    """
+    to_dict() 共用實作
+    
+    子類別以 _DICT_FIELDS 宣告輸出欄位（依輸出順序）。attrgetter 與 datetime 欄位清單
+    在每個類別第一次呼叫 to_dict() 時依 __table__ 的欄位型別建立一次，之後快取在該類別上。
+    """
+    
+    _DICT_FIELDS = ()
+    
+    @classmethod
+    def _dict_spec(cls):
+        """回傳 (attrgetter, datetime 欄位 tuple)，每個類別只建立一次"""
+        spec = cls.__dict__.get("_dict_spec_cache")
+        if spec is None:
+            datetime_fields = tuple(
+                name for name in cls._DICT_FIELDS
+                if isinstance(cls.__table__.c[name].type, DateTime)
+            )
+            spec = (attrgetter(*cls._DICT_FIELDS), datetime_fields)
+            cls._dict_spec_cache = spec
+        return spec
+    
+    def to_dict(self):
+        """
+        將模型轉換為字典
+        
+        方便 JSON 序列化，用於 API 回應。
+        已載入的欄位值直接從實例 __dict__ 讀取，不經過 InstrumentedAttribute descriptor；
+        有欄位尚未載入或已 expire 時（不在 __dict__ 中）才改用 attrgetter 走正常的載入流程。
+        datetime 欄位轉為 ISO 字串（None 保持 None）。
+        
+        Returns:
+            dict: 包含 _DICT_FIELDS 所有欄位的字典
+        """
+        fields = self._DICT_FIELDS
+        getter, datetime_fields = self._dict_spec()
+        try:
+            values = tuple(map(self.__dict__.__getitem__, fields))
+        except KeyError:
+            values = getter(self)
+        data = dict(zip(fields, values))
+        for key in datetime_fields:
+            value = data[key]
+            data[key] = value.isoformat() if value else None
+        return data
+
 
-class Position(Base):
+class Position(_DictMixin, Base):
     """
     倉位資料模型
     
@@ -23,9 +77,20 @@ class Position(Base):
     """
     
     __tablename__ = "positions"
+    # INSERT 時透過 RETURNING 一併取得 server default 欄位（id、created_at 等），建立後不需要再 refresh
+    __mapper_args__ = {"eager_defaults": True}
+    # 複合索引（既有資料庫請執行 migrate_add_position_indexes.py）：
+    # - symbol + side + status：以 Binance 倉位查找對應的本地 OPEN Position
+    # - status + closed_at：統計 / 匯出已平倉倉位的日期區間查詢
+    # - bot_id + status：刪除 Bot 前檢查是否仍有 OPEN 倉位
+    __table_args__ = (
+        Index("ix_positions_symbol_side_status", "symbol", "side", "status"),
+        Index("ix_positions_status_closed_at", "status", "closed_at"),
+        Index("ix_positions_bot_id_status", "bot_id", "status"),
+    )
     
     # 主鍵：自動遞增的 ID
-    id = Column(Integer, primary_key=True, index=True, comment="倉位 ID")
+    id = Column(_BigIntPK, primary_key=True, index=True, comment="倉位 ID")
     
     # 交易資訊
     symbol = Column(String(20), nullable=False, index=True, comment="交易對，例如：BTCUSDT")
@@ -41,7 +106,7 @@ class Position(Base):
     status = Column(String(20), default="OPEN", nullable=False, index=True, comment="倉位狀態：OPEN, CLOSING, CLOSED, ERROR")
     
     # 訂單追蹤
-    binance_order_id = Column(Integer, nullable=True, unique=True, index=True, comment="幣安訂單 ID（建立倉位的訂單）")
+    binance_order_id = Column(BigInteger, nullable=True, unique=True, index=True, comment="幣安訂單 ID（建立倉位的訂單）")
     client_order_id = Column(String(50), nullable=True, comment="客戶端訂單 ID")
     
     # Bot 關聯
@@ -70,38 +135,30 @@ class Position(Base):
         """字串表示，方便除錯"""
         return f"<Position(id={self.id}, symbol={self.symbol}, side={self.side}, qty={self.qty}, status={self.status})>"
     
-    def to_dict(self):
-        """
-        將模型轉換為字典
-        
-        方便 JSON 序列化，用於 API 回應。
-        
-        Returns:
-            dict: 包含所有欄位的字典
-        """
-        return {
-            "id": self.id,
-            "symbol": self.symbol,
-            "side": self.side,
-            "qty": self.qty,
-            "entry_price": self.entry_price,
-            "status": self.status,
-            "binance_order_id": self.binance_order_id,
-            "client_order_id": self.client_order_id,
-            "highest_price": self.highest_price,
-            "trail_callback": self.trail_callback,
-            "exit_price": self.exit_price,
-            "exit_reason": self.exit_reason,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "closed_at": self.closed_at.isoformat() if self.closed_at else None,
-            "bot_id": self.bot_id,
-            "tv_signal_log_id": self.tv_signal_log_id,
-            "dyn_profit_threshold_pct": self.dyn_profit_threshold_pct,
-            "base_stop_loss_pct": self.base_stop_loss_pct,
-        }
+    # to_dict() 輸出的欄位（依輸出順序）
+    _DICT_FIELDS = (
+        "id",
+        "symbol",
+        "side",
+        "qty",
+        "entry_price",
+        "status",
+        "binance_order_id",
+        "client_order_id",
+        "highest_price",
+        "trail_callback",
+        "exit_price",
+        "exit_reason",
+        "created_at",
+        "closed_at",
+        "bot_id",
+        "tv_signal_log_id",
+        "dyn_profit_threshold_pct",
+        "base_stop_loss_pct",
+    )
 
 
-class TVSignalConfig(Base):
+class TVSignalConfig(_DictMixin, Base):
     """
     TradingView Signal 策略配置模型
     
@@ -110,6 +167,8 @@ class TVSignalConfig(Base):
     """
     
     __tablename__ = "tv_signal_configs"
+    # INSERT 時透過 RETURNING 一併取得 server default 欄位（id、created_at 等），建立後不需要再 refresh
+    __mapper_args__ = {"eager_defaults": True}
     
     # 主鍵
     id = Column(Integer, primary_key=True, index=True, comment="Signal Config ID")
@@ -134,22 +193,20 @@ class TVSignalConfig(Base):
         """字串表示，方便除錯"""
         return f"<TVSignalConfig(id={self.id}, name={self.name}, signal_key={self.signal_key}, enabled={self.enabled})>"
     
-    def to_dict(self):
-        """將模型轉換為字典"""
-        return {
-            "id": self.id,
-            "name": self.name,
-            "signal_key": self.signal_key,
-            "description": self.description,
-            "symbol_hint": self.symbol_hint,
-            "timeframe_hint": self.timeframe_hint,
-            "enabled": self.enabled,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
-        }
+    _DICT_FIELDS = (
+        "id",
+        "name",
+        "signal_key",
+        "description",
+        "symbol_hint",
+        "timeframe_hint",
+        "enabled",
+        "created_at",
+        "updated_at",
+    )
 
 
-class TradingViewSignalLog(Base):
+class TradingViewSignalLog(_DictMixin, Base):
     """
     TradingView Signal 日誌模型
     
@@ -159,12 +216,11 @@ class TradingViewSignalLog(Base):
     __tablename__ = "tv_signal_logs"
     
     # 主鍵
-    id = Column(Integer, primary_key=True, index=True, comment="Signal Log ID")
+    id = Column(_BigIntPK, primary_key=True, index=True, comment="Signal Log ID")
     
     # Signal 資訊（保留 bot_key 以兼容舊格式）
     bot_key = Column(String(100), nullable=True, index=True, comment="對應的 Bot Key（舊格式兼容），例如 btc_short_v1")
     signal_id = Column(Integer, ForeignKey("tv_signal_configs.id"), nullable=True, index=True, comment="關聯的 Signal Config ID（新格式）")
-    signal = relationship("TVSignalConfig", foreign_keys=[signal_id])
     
     symbol = Column(String(50), nullable=False, index=True, comment="交易對，例如 BTCUSDT")
     side = Column(String(10), nullable=False, comment="交易方向：BUY 或 SELL")
@@ -174,7 +230,8 @@ class TradingViewSignalLog(Base):
     # 原始資料與處理狀態
     raw_body = Column(JSON, nullable=True, comment="完整的原始 payload（JSON 格式）")
     raw_payload = Column(Text, nullable=True, comment="完整的原始 payload（JSON 字串），用於 debug")
-    received_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, comment="接收時間")
+    # received_at 索引：清理舊 logs（prune）與 webhook 重複訊號檢查都以時間區間查詢
+    received_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True, comment="接收時間")
     processed = Column(Boolean, default=False, nullable=False, index=True, comment="是否已嘗試交給 Bot 處理")
     process_result = Column(String(255), nullable=True, comment="處理結果簡短描述，例如 OK: bot_ids=[1,2], position_ids=[10,11]")
     
@@ -182,25 +239,23 @@ class TradingViewSignalLog(Base):
         """字串表示，方便除錯"""
         return f"<TradingViewSignalLog(id={self.id}, bot_key={self.bot_key}, signal_id={self.signal_id}, symbol={self.symbol}, side={self.side}, processed={self.processed})>"
     
-    def to_dict(self):
-        """將模型轉換為字典"""
-        return {
-            "id": self.id,
-            "bot_key": self.bot_key,
-            "signal_id": self.signal_id,
-            "symbol": self.symbol,
-            "side": self.side,
-            "qty": self.qty,
-            "position_size": self.position_size,
-            "raw_body": self.raw_body,
-            "raw_payload": self.raw_payload,
-            "received_at": self.received_at.isoformat() if self.received_at else None,
-            "processed": self.processed,
-            "process_result": self.process_result,
-        }
+    _DICT_FIELDS = (
+        "id",
+        "bot_key",
+        "signal_id",
+        "symbol",
+        "side",
+        "qty",
+        "position_size",
+        "raw_body",
+        "raw_payload",
+        "received_at",
+        "processed",
+        "process_result",
+    )
 
 
-class BotConfig(Base):
+class BotConfig(_DictMixin, Base):
     """
     Bot 設定模型
     
@@ -212,6 +267,8 @@ class BotConfig(Base):
     """
     
     __tablename__ = "bot_configs"
+    # INSERT 時透過 RETURNING 一併取得 server default 欄位（id、created_at 等），建立後不需要再 refresh
+    __mapper_args__ = {"eager_defaults": True}
     
     # 主鍵
     id = Column(Integer, primary_key=True, index=True, comment="Bot ID")
@@ -223,7 +280,9 @@ class BotConfig(Base):
     
     # Signal 關聯（新架構）
     signal_id = Column(Integer, ForeignKey("tv_signal_configs.id"), nullable=True, index=True, comment="關聯的 Signal Config ID，NULL 表示不綁定 Signal（舊 Bot 或獨立 Bot）")
-    signal = relationship("TVSignalConfig", foreign_keys=[signal_id], backref="bots")
+    # 不允許隱式 lazy load（避免列表逐筆查詢的 N+1），需要時以 selectinload / joinedload 明確載入；
+    # 不建立反向的 TVSignalConfig.bots：刪除 Signal Config 前已檢查沒有關聯的 Bot，ORM 不必再載入集合
+    signal = relationship("TVSignalConfig", foreign_keys=[signal_id], lazy="raise_on_sql")
     
     # 交易相關設定
     symbol = Column(String(50), nullable=False, default="BTCUSDT", comment="交易對，例如 BTCUSDT")
@@ -246,24 +305,22 @@ class BotConfig(Base):
         """字串表示，方便除錯"""
         return f"<BotConfig(id={self.id}, name={self.name}, bot_key={self.bot_key}, enabled={self.enabled})>"
     
-    def to_dict(self):
-        """將模型轉換為字典"""
-        return {
-            "id": self.id,
-            "name": self.name,
-            "bot_key": self.bot_key,
-            "enabled": self.enabled,
-            "symbol": self.symbol,
-            "use_signal_side": self.use_signal_side,
-            "fixed_side": self.fixed_side,
-            "qty": self.qty,
-            "max_invest_usdt": self.max_invest_usdt,
-            "leverage": self.leverage,
-            "use_dynamic_stop": self.use_dynamic_stop,
-            "trailing_callback_percent": self.trailing_callback_percent,
-            "base_stop_loss_pct": self.base_stop_loss_pct,
-            "signal_id": self.signal_id,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
-        }
+    _DICT_FIELDS = (
+        "id",
+        "name",
+        "bot_key",
+        "enabled",
+        "symbol",
+        "use_signal_side",
+        "fixed_side",
+        "qty",
+        "max_invest_usdt",
+        "leverage",
+        "use_dynamic_stop",
+        "trailing_callback_percent",
+        "base_stop_loss_pct",
+        "signal_id",
+        "created_at",
+        "updated_at",
+    )
 